@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+from functools import lru_cache
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# Scripts of the web interface served by the app itself (see server.AssetHandler), no CDN required
+# Each asset is served under a versioned URL (assets/<name>-<version>.js, the version is a hash of the content),
+# so browsers may cache it indefinitely
+
+
+# --- ASSETS --- #
+
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+# Function to read the plotly.js bundle shipped with the plotly package
+def plotly_js():
+    with open(os.path.join(os.path.dirname(importlib.util.find_spec("plotly").origin), "package_data", "plotly.min.js"), "rb") as file:
+        return file.read()
+
+# Function to create a module of the default plotly template (as applied by plotly.io)
+def template_js():
+    import plotly.io
+    template = plotly.io.templates[plotly.io.templates.default].to_plotly_json()
+    return ("define(" + json.dumps(template, separators=(",", ":")) + ");").encode("utf-8")
+
+# Function to read the client-side result renderer
+def result_js():
+    with open(os.path.join(ASSETS_PATH, "result.js"), "rb") as file:
+        return file.read()
+
+# Asset name: function creating the content
+ASSETS = {
+    "plotly": plotly_js,
+    "template": template_js,
+    "result": result_js,
+}
+
+
+# --- FUNCTIONS --- #
+
+# Function to get the content of an asset
+@lru_cache(maxsize=None)
+def asset_content(name):
+    return ASSETS[name]()
+
+# Function to get the version of an asset
+@lru_cache(maxsize=None)
+def asset_version(name):
+    return hashlib.sha256(asset_content(name)).hexdigest()[:16]
+
+# Function to get the gzipped content of an asset
+@lru_cache(maxsize=None)
+def asset_gzipped(name):
+    return gzip.compress(asset_content(name), compresslevel=9, mtime=0)
+
+# Function to get the URL of an asset (relative to the app)
+def asset_url(name):
+    return "assets/" + name + "-" + asset_version(name) + ".js"
+
+# Function to load all assets (e.g. before forking the workers)
+def preload():
+    for name in ASSETS:
+        asset_gzipped(name)
+        asset_version(name)
@@ -0,0 +1,445 @@
+// ~~ LICENSE (EN) ~~
+// Copyrighted, Roger Meier 2021
+// Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+// that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+// Any redistribution must include the specific provisions above.
+// You should have received a copy of the EUPL-1.2 along with this code.
+// If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+// Client-side rendering of a result (JSON object as returned by POST /evaluate, see server.format_result)
+// Renders the key results, the tables of all periods and the timeline chart into an element
+// Options:
+// - lang: "en" or "de"
+// - plotly, template: URLs of plotly.js and the plotly template (see assets.py)
+// - termination, trial, incapacity: whether a termination, a probation period or incapacities were evaluated
+// - incapacities: the incapacity periods as entered (list of incapacities, each a list of [start, end])
+// - termination_date: date of the termination line in the chart
+
+
+define(function () {
+
+    // --- TEXTS --- //
+
+    var TEXTS = {
+        en: {
+            key_results: "Key Results",
+            valid: "✅ Your termination appears valid.",
+            invalid: "⛔ YOUR TERMINATION APPEARS INVALID.",
+            not_evaluated: "[--> No termination evaluated]",
+            no_termination: "[--> No termination evaluated]",
+            no_valid_termination: "[--> No valid termination]",
+            standard_case: "Regular termination of employment.",
+            trial_case: "Termination during probation period.",
+            embargo_case: "The termination was issued during an embargo period.",
+            validity: "Validity of Termination:",
+            reason: "Reason:",
+            missed_workdays: "Missed Workdays Probation Period:",
+            trial_end: "Probation Period End Date:",
+            compensation_days: "Compensation Days Notice Period:",
+            employment_end: "Employment End Date:",
+            see_below: "[--> Please see below for detailed breakdown of embargo and sick pay periods]",
+            detailed_results: "Detailed Results",
+            incapacities: "Evaluated Incapacities (Your Input)",
+            incapacity_period: "Incapacity // Period",
+            no: "No.",
+            type: "Type",
+            start: "Start",
+            end: "End",
+            duration: "Duration",
+            days: " days",
+            no_incapacities: "[--> No incapacities evaluated]",
+            trial_period: "Probation Period",
+            no_trial_period: "[--> No probation period evaluated]",
+            embargo_by_incapacity: "Embargo Periods (by incapacity)",
+            embargo_merged: "Embargo Periods (merged)",
+            no_embargo: "[--> No embargo periods evaluated]",
+            sick_pay_periods: "Sick Pay Periods",
+            no_sick_pay: "[--> No sick pay periods evaluated]",
+            notice_period: "Notice Period",
+            original_notice: "Original Notice Period",
+            notice_compensation: "Notice Period Compensation",
+            notice_extension: "Notice Period Extension",
+            no_notice: "[--> No notice period evaluated]",
+            visualization: "Visualization",
+            visual_aid: "IMPORTANT: The chart below is intended only as a visual aid. Please consult the tables above for your results.",
+            further_information: "Further Information",
+            notes: [
+                "This visualization ist interactive - use direct control or the control panel on the top right to navigate the chart area or to hide bars.",
+                "An export of the chart area as PNG is possible via the control panel on the top right.",
+                "It is currently not possible to visualize single days, e.g. a notice period extension of a single day does not show."],
+            bar_sick_pay: "Sick Pay",
+            bar_trial: "Probation Period",
+            bar_employment: "Regular Employment",
+            bar_embargo: "Embargo Period",
+            bar_notice: "Regular Notice Period",
+            bar_compensation: "Compensation Missed Notice Period",
+            bar_extension: "Notice Period Extension",
+            bar_incapacity: "Incapacity",
+            termination: "Termination",
+        },
+        de: {
+            key_results: "Wichtigste Resultate",
+            valid: "✅ Ihre Kündigung scheint gültig zu sein.",
+            invalid: "⛔ IHRE KÜNDIGUNG SCHEINT UNGÜLTIG ZU SEIN.",
+            not_evaluated: "[--> Keine Kündigung evaluiert]",
+            no_termination: "[--> Keine Kündigung ausgewertet]",
+            no_valid_termination: "[--> Keine gültige Kündigung]",
+            standard_case: "Ordentliche Kündigung des Arbeitsverhältnisses.",
+            trial_case: "Kündigung während Probezeit.",
+            embargo_case: "Die Kündigung wurde während einer Sperrfrist ausgesprochen.",
+            validity: "Gültigkeit Kündigung:",
+            reason: "Begründung:",
+            missed_workdays: "Verpasste Arbeitstage Probezeit:",
+            trial_end: "Enddatum Probezeit:",
+            compensation_days: "Kompensationstage Kündigungsfrist:",
+            employment_end: "Enddatum Anstellung:",
+            see_below: "[--> Bitte konsultieren Sie die untenstehende Auflistung der Sperr- und Lohnfortzahlungsfristen]",
+            detailed_results: "Detaillierte Ergebnisse",
+            incapacities: "Ausgewertete Arbeitsunfähigkeiten (Ihre Eingabe)",
+            incapacity_period: "Arbeitsunfähigkeit // Periode",
+            no: "Nr.",
+            type: "Typ",
+            start: "Start",
+            end: "Ende",
+            duration: "Dauer",
+            days: " Tage",
+            no_incapacities: "[--> Keine Arbeitsunfähigkeiten ausgewertet]",
+            trial_period: "Probezeit",
+            no_trial_period: "[--> Keine Probezeit ausgewertet]",
+            embargo_by_incapacity: "Sperrfristen (nach Arbeitsunfähigkeit)",
+            embargo_merged: "Sperrfristen (vereinigt)",
+            no_embargo: "[--> Keine Sperrfristen ausgewertet]",
+            sick_pay_periods: "Perioden Lohnfortzahlung",
+            no_sick_pay: "[--> Keine Lohnfortzahlungsfristen ausgewertet]",
+            notice_period: "Kündigungsfrist",
+            original_notice: "Ursprüngliche Kündigungsfrist",
+            notice_compensation: "Kompensation Kündigungsfrist",
+            notice_extension: "Verlängerung Kündigungsfrist",
+            no_notice: "[--> Keine Kündigungsfrist ausgewertet]",
+            visualization: "Visualisierung",
+            visual_aid: "WICHTIG: Die nachfolgende Grafik ist nur als visuelle Hilfe gedacht. Ihre Ergebnisse entnehmen Sie bitte der Tabelle hiervor.",
+            further_information: "Ergänzende Hinweise",
+            notes: [
+                "Diese Visualisierung ist interaktiv - nutzen Sie die Direktsteuerung oder das Steuerpanel rechts oben um im Diagrammbereich zu navigieren oder Elemente auszublenden.",
+                "Ein Export als PNG ist über das Steuerpanel rechts oben möglich.",
+                "Derzeit ist es nicht möglich, einzelne Tage zu visualisieren. Das bedeutet beispielsweise, dass die Verlängerung der Kündigungsfrist um einen einzelnen Tag nicht angezeigt wird."],
+            bar_sick_pay: "Lohnfortzahlung",
+            bar_trial: "Probezeit",
+            bar_employment: "Reguläre Anstellung",
+            bar_embargo: "Sperrfrist",
+            bar_notice: "Ordentliche Kündigungsfrist",
+            bar_compensation: "Kompensation verpasste Kündigungsfrist",
+            bar_extension: "Verlängerung Kündigungsfrist",
+            bar_incapacity: "Arbeitsunfähigkeit",
+            termination: "Kündigung",
+        },
+    };
+
+    // Bar colors by bar type
+    var COLORS = {
+        placeholder: "#ffffff",
+        bar_sick_pay: "#f032e6",
+        bar_trial: "#f58231",
+        bar_employment: "#3cb44b",
+        bar_embargo: "#e6194B",
+        bar_notice: "#FF97FF",
+        bar_compensation: "#4363d8",
+        bar_extension: "#911eb4",
+        bar_incapacity: "#9A6324",
+    };
+
+
+    // --- FUNCTIONS --- //
+
+    // Function to convert a "YYYY-MM-DD" date into milliseconds since 01.01.1970 (UTC)
+    function toTime(date) {
+        var parts = date.split("-");
+        return Date.UTC(parseInt(parts[0], 10), parseInt(parts[1], 10) - 1, parseInt(parts[2], 10));
+    }
+
+    // Function to format a "YYYY-MM-DD" date as "DD.MM.YYYY"
+    function formatDate(date) {
+        var parts = date.split("-");
+        return parts[2] + "." + parts[1] + "." + parts[0];
+    }
+
+    // Function to calculate the duration of a period in days, both days included
+    function duration(period) {
+        return Math.round((toTime(period[1]) - toTime(period[0])) / 86400000) + 1;
+    }
+
+    // Function to escape text for HTML
+    function escape(text) {
+        return String(text).replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;").replace(/"/g, "&quot;");
+    }
+
+    // Function to create a heading
+    function heading(level, text, margin) {
+        return "<h" + level + ' style="margin-top: ' + margin + 'px">' + escape(text) + "</h" + level + ">";
+    }
+
+    // Function to create a paragraph
+    function paragraph(text) {
+        return "<p>" + escape(text) + "</p>";
+    }
+
+    // Function to create a table of key results (label, value)
+    function keyTable(rows) {
+        var html = '<table class="table table-sm"><tbody>';
+        rows.forEach(function (row) {
+            html += '<tr><th style="width: 35%">' + escape(row[0]) + "</th><td>" + escape(row[1]) + "</td></tr>";
+        });
+        return html + "</tbody></table>";
+    }
+
+    // Function to create a table of periods, rows of (label, [start, end])
+    function periodTable(texts, label, rows) {
+        var html = '<table class="table table-sm"><thead><tr><th>' + escape(label) + "</th><th>" + escape(texts.start) +
+            "</th><th>" + escape(texts.end) + "</th><th>" + escape(texts.duration) + "</th></tr></thead><tbody>";
+        rows.forEach(function (row) {
+            html += "<tr><td>" + escape(row[0]) + "</td><td>" + formatDate(row[1][0]) + "</td><td>" + formatDate(row[1][1]) +
+                "</td><td>" + duration(row[1]) + escape(texts.days) + "</td></tr>";
+        });
+        return html + "</tbody></table>";
+    }
+
+    // Function to create the rows of nested periods ("incapacity // period"), empty periods are skipped but counted
+    function nestedRows(groups) {
+        var rows = [];
+        groups.forEach(function (periods, group) {
+            periods.forEach(function (period, index) {
+                if (period.length == 2) {
+                    rows.push([(group + 1) + " // " + index, period]);
+                }
+            });
+        });
+        return rows;
+    }
+
+    // Function to create numbered rows of periods
+    function numberedRows(periods) {
+        return periods.map(function (period, index) {
+            return [String(index + 1), period];
+        });
+    }
+
+
+    // --- SECTIONS --- //
+
+    // Function to create the key results
+    function keyResults(texts, result, options) {
+        var rows = [];
+        var validity = {standard_case: texts.valid, trial_case: texts.valid, embargo_case: texts.invalid};
+        var employmentEnd = texts.no_termination;
+        if (result.termination_case == "embargo_case") {
+            employmentEnd = texts.no_valid_termination;
+        }
+        if (result.new_employment_end !== null) {
+            employmentEnd = formatDate(result.new_employment_end);
+        }
+        if (options.termination) {
+            rows.push([texts.validity, validity[result.termination_case] || texts.not_evaluated]);
+            rows.push([texts.reason, texts[result.termination_case] || texts.no_termination]);
+        }
+        if (options.trial) {
+            rows.push([texts.missed_workdays, String(result.trial_extension_days)]);
+            rows.push([texts.trial_end, formatDate(result.trial_period[result.trial_period.length - 1])]);
+        }
+        if (options.termination) {
+            rows.push([texts.compensation_days, String(result.notice_overlap)]);
+            rows.push([texts.employment_end, employmentEnd]);
+        }
+        var html = heading(2, texts.key_results, 20);
+        if (rows.length > 0) {
+            html += keyTable(rows);
+        } else {
+            html += paragraph(texts.see_below);
+        }
+        return html;
+    }
+
+    // Function to create the tables of all periods
+    function detailedResults(texts, result, options) {
+        var html = heading(2, texts.detailed_results, 30);
+
+        html += heading(3, texts.incapacities, 20);
+        html += options.incapacity ? periodTable(texts, texts.incapacity_period, nestedRows(options.incapacities)) : paragraph(texts.no_incapacities);
+
+        html += heading(3, texts.trial_period, 20);
+        html += options.trial ? periodTable(texts, "", [[texts.trial_period, result.trial_period]]) : paragraph(texts.no_trial_period);
+
+        var embargoByIncapacity = Object.keys(result.embargo_by_incapacity).map(function (key) {
+            return result.embargo_by_incapacity[key];
+        });
+        html += heading(3, texts.embargo_by_incapacity, 20);
+        html += options.incapacity ? periodTable(texts, texts.incapacity_period, nestedRows(embargoByIncapacity)) : paragraph(texts.no_embargo);
+
+        html += heading(3, texts.embargo_merged, 20);
+        html += options.incapacity ? periodTable(texts, texts.no, numberedRows(result.embargo_periods)) : paragraph(texts.no_embargo);
+
+        html += heading(3, texts.sick_pay_periods, 20);
+        html += options.incapacity ? periodTable(texts, texts.no, numberedRows(result.sick_pay_periods)) : paragraph(texts.no_sick_pay);
+
+        html += heading(3, texts.notice_period, 20);
+        if (options.termination && (result.termination_case != "embargo_case")) {
+            var rows = [[texts.original_notice, result.notice_period]];
+            if (result.notice_compensation.length == 2) {
+                rows.push([texts.notice_compensation, result.notice_compensation]);
+            }
+            if (result.notice_extension.length == 2) {
+                rows.push([texts.notice_extension, result.notice_extension]);
+            }
+            html += periodTable(texts, texts.type, rows);
+        } else {
+            html += paragraph(texts.no_notice);
+        }
+        return html;
+    }
+
+
+    // --- TIMELINE --- //
+
+    // Function to create one bar trace per bar type from rows of (type, period, stack)
+    // Same traces as timeline.timeline_traces, missing dates are not shown
+    function timelineTraces(texts, rows) {
+        var traces = {};
+        var order = [];
+        rows.forEach(function (row) {
+            var type = row[0];
+            var name = (type == "placeholder") ? row[3] : texts[type];
+            if (!(name in traces)) {
+                order.push(name);
+                traces[name] = {
+                    type: "bar",
+                    orientation: "h",
+                    name: name,
+                    legendgroup: name,
+                    showlegend: true,
+                    marker: {color: COLORS[type], opacity: 1, pattern: {shape: ""}, line: {width: 1.0}},
+                    opacity: 0.95,
+                    textposition: "auto",
+                    hovertemplate: "<b>%{hovertext}</b><br><br>start=%{base}<br>end=%{x}<extra></extra>",
+                    base: [],
+                    x: [],
+                    y: [],
+                    hovertext: [],
+                    xaxis: "x",
+                    yaxis: "y",
+                };
+            }
+            var period = row[1];
+            var complete = period.length == 2;
+            traces[name].base.push(period.length > 0 ? period[0] : null);
+            traces[name].x.push(complete ? toTime(period[1]) - toTime(period[0]) : null);
+            traces[name].y.push(row[2]);
+            traces[name].hovertext.push(name);
+        });
+        return order.map(function (name) {
+            return traces[name];
+        });
+    }
+
+    // Function to create the timeline figure, same as the chart of the server-side rendering (see work_calc.timeline_chart)
+    function timelineFigure(texts, result, options, template) {
+        var termination = options.termination_date;
+        var rows = [["placeholder", [termination, termination], "stack_1", "[PH_T]"]];
+        result.sick_pay_periods.forEach(function (period) {
+            rows.push(["bar_sick_pay", period, "stack_2"]);
+        });
+        rows.push(["bar_trial", result.trial_period, "stack_3"]);
+        rows.push(["bar_employment", result.regular_employment, "stack_3"]);
+        result.embargo_periods.forEach(function (period) {
+            rows.push(["bar_embargo", period, "stack_3"]);
+        });
+        rows.push(["bar_notice", result.notice_period, "stack_3"]);
+        rows.push(["bar_compensation", result.notice_compensation, "stack_3"]);
+        rows.push(["bar_extension", result.notice_extension, "stack_3"]);
+        result.incapacity_periods.forEach(function (period) {
+            rows.push(["bar_incapacity", period, "stack_4"]);
+        });
+        rows.push(["placeholder", [termination, termination], "stack_5", "[PH_B]"]);
+
+        var line = function (x, color, width) {
+            return {x0: x, x1: x, line: {color: color, width: width}, fillcolor: color, y0: 0, y1: 1, xref: "x", yref: "paper"};
+        };
+        var label = function (x, y, color, text) {
+            return {x: x, y: y, xref: "x", yref: "paper", font: {size: 16, color: color}, showarrow: false, xanchor: "left", text: text};
+        };
+        var seniority = result.seniority_years;
+
+        return {
+            data: timelineTraces(texts, rows),
+            layout: {
+                template: template,
+                width: 1000,
+                height: 700,
+                barmode: "overlay",
+                xaxis: {
+                    anchor: "y",
+                    domain: [0.0, 1.0],
+                    range: [result.regular_employment[0], result.regular_employment[1]],
+                    automargin: true,
+                    dtick: "M12",
+                    tickformat: "%d.%m.%Y",
+                    type: "date",
+                    showgrid: true,
+                    rangeslider: {visible: true},
+                },
+                margin: {b: 100, t: 200},
+                yaxis: {
+                    anchor: "x",
+                    domain: [0.0, 1.0],
+                    title: {text: "stack"},
+                    automargin: true,
+                    visible: false,
+                    autorange: "reversed",
+                    showgrid: true,
+                },
+                legend: {title: {text: ""}, tracegroupgap: 0, orientation: "h", font: {size: 16}, x: 0, y: 1.1},
+                shapes: [
+                    line(termination, "#DB162F", 3),
+                    line(seniority[1], "#3B6728", 1.5),
+                    line(seniority[5], "#3B6728", 1.5),
+                ],
+                annotations: [
+                    label(termination, 1, "#DB162F", texts.termination),
+                    label(seniority[1], 0.05, "#3B6728", "1Y"),
+                    label(seniority[5], 0.05, "#3B6728", "5Y"),
+                ],
+            },
+        };
+    }
+
+    // Function to create the visualization section, returns the HTML and the id of the chart element
+    function visualization(texts, chartId) {
+        var html = heading(2, texts.visualization, 20) + paragraph(texts.visual_aid);
+        html += '<details style="margin-top: 20px"><summary>' + escape(texts.further_information) + "</summary><ul>";
+        texts.notes.forEach(function (note) {
+            html += "<li>" + escape(note) + "</li>";
+        });
+        html += "</ul></details>";
+        return html + '<div id="' + chartId + '" style="border: 1px solid #dfe2e5; height: 700px; width: 1000px; margin-top: 20px"></div>';
+    }
+
+
+    // --- RENDER --- //
+
+    // Function to render a result into the element with the given id
+    function render(elementId, result, options) {
+        var texts = TEXTS[options.lang] || TEXTS.en;
+        var chartId = elementId + "-chart";
+        document.getElementById(elementId).innerHTML =
+            keyResults(texts, result, options) + detailedResults(texts, result, options) + visualization(texts, chartId);
+        require([options.plotly, options.template], function (Plotly, template) {
+            var figure = timelineFigure(texts, result, options, template);
+            Plotly.newPlot(chartId, figure.data, figure.layout, {
+                displayModeBar: true,
+                displaylogo: false,
+                modeBarButtonsToRemove: ["select2d", "lasso2d"],
+            });
+        });
+    }
+
+    return {render: render};
+});
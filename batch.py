@@ -0,0 +1,353 @@
+import argparse
+import collections
+import csv
+import datetime
+import itertools
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import engine
+import workday_arrays
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# --- COLUMNS --- #
+
+# Input columns, all but employment_start and canton are optional
+# - dates: YYYY-MM-DD or DD.MM.YYYY
+# - incapacities: periods as "start/end", separated by ";", seperate incapacities separated by "|"
+# - workdays: weekday numbers (0 = Monday), separated by ","
+INPUT_COLUMNS = ["employment_start", "canton", "incapacity_type", "incapacities", "trial_months", "workdays",
+                 "termination_date", "notice_months", "endpoint", "trial_notice_days"]
+
+# Output columns, appended to the input columns
+OUTPUT_COLUMNS = ["termination_case", "valid", "new_employment_end", "trial_end", "notice_overlap",
+                  "embargo_periods", "embargo_days", "sick_pay_periods", "sick_pay_days", "error"]
+
+# Rows per batch when reading and writing Parquet files
+PARQUET_BATCH_SIZE = 1024
+
+# Rows per chunk handed to a worker process
+CHUNK_SIZE = 256
+
+
+# --- FUNCTIONS --- #
+
+# Function to check if a cell is empty (CSV: empty string, Parquet: None)
+def is_empty(value):
+    return value is None or (isinstance(value, str) and value.strip() == "")
+
+# Function to parse a date cell
+def parse_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if not isinstance(value, str):
+        raise ValueError("A date must be given as YYYY-MM-DD or DD.MM.YYYY: " + repr(value))
+    value = value.strip()
+    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", value):
+        date_format = "%Y-%m-%d"
+    elif re.fullmatch(r"\d{1,2}\.\d{1,2}\.\d{4}", value):
+        date_format = "%d.%m.%Y"
+    else:
+        raise ValueError("A date must be given as YYYY-MM-DD or DD.MM.YYYY: " + value)
+    try:
+        return datetime.datetime.strptime(value, date_format).date()
+    except ValueError as error:
+        raise ValueError("Invalid date " + value + ": " + str(error))
+
+# Function to parse an optional integer cell
+def parse_int(value, default=None):
+    if is_empty(value):
+        return default
+    return int(value)
+
+# Function to parse the incapacities cell into a list of period lists
+def parse_incapacities(value):
+    if is_empty(value):
+        return []
+    incapacities = []
+    for incapacity in value.split("|"):
+        periods = []
+        for period in incapacity.split(";"):
+            if period.strip() == "":
+                continue
+            dates = period.split("/")
+            if len(dates) != 2:
+                raise ValueError("A period must be given as start/end: " + period.strip())
+            periods.append((parse_date(dates[0]), parse_date(dates[1])))
+        incapacities.append(periods)
+    return incapacities
+
+# Function to build a case from an input row
+# The case is checked as those of the JSON API (see engine.validate_case)
+def parse_case(row):
+    # csv.DictReader collects cells beyond the header under None
+    if None in row:
+        raise ValueError("Row has more cells than the header: " + ",".join(str(value) for value in row[None]))
+    incapacity_type = row.get("incapacity_type")
+    if is_empty(incapacity_type):
+        incapacity_type = None
+    endpoint = row.get("endpoint")
+    if is_empty(endpoint):
+        endpoint = "month"
+    workdays = row.get("workdays")
+    if is_empty(workdays):
+        workdays = (0, 1, 2, 3, 4)
+    else:
+        workdays = tuple(int(day) for day in str(workdays).split(","))
+    termination_date = row.get("termination_date")
+    case = engine.Case(
+        employment_start=parse_date(row["employment_start"]),
+        canton=row["canton"],
+        incapacity_type=incapacity_type,
+        incapacities=parse_incapacities(row.get("incapacities")),
+        trial_months=parse_int(row.get("trial_months")),
+        workdays=workdays,
+        termination_date=None if is_empty(termination_date) else parse_date(termination_date),
+        notice_months=parse_int(row.get("notice_months")),
+        endpoint=endpoint,
+        trial_notice_days=parse_int(row.get("trial_notice_days"), 7))
+    engine.validate_case(case)
+    return case
+
+# Function to format periods as "start/end" separated by ";"
+def format_periods(periods):
+    return ";".join(sublst[0].isoformat() + "/" + sublst[1].isoformat() for sublst in periods)
+
+# Function to sum up the duration of periods in days
+def total_days(periods):
+    return sum(engine.period_duration(sublst[0], sublst[1]) for sublst in periods)
+
+# Function to build the output columns from a result
+def format_result(result, trial_relevance):
+    return {
+        "termination_case": result.termination_case,
+        "valid": result.valid,
+        "new_employment_end": result.new_employment_end,
+        "trial_end": result.trial_period[-1] if trial_relevance else None,
+        "notice_overlap": result.notice_overlap,
+        "embargo_periods": format_periods(result.embargo_periods),
+        "embargo_days": total_days(result.embargo_periods),
+        "sick_pay_periods": format_periods(result.sick_pay_periods),
+        "sick_pay_days": total_days(result.sick_pay_periods),
+        "error": None,
+    }
+
+# Function to build the output columns if a case could not be evaluated
+def format_error(error):
+    row = dict.fromkeys(OUTPUT_COLUMNS)
+    row["error"] = type(error).__name__ + ": " + str(error)
+    return row
+
+# Function to evaluate input rows lazily, one output row per input row (chunk by chunk)
+def evaluate_rows(rows, chunk_size=CHUNK_SIZE):
+    for chunk in chunks(rows, chunk_size):
+        for row, result in zip(chunk, evaluate_chunk(chunk)):
+            yield {**row, **result}
+
+# Function to evaluate a chunk of input rows (runs in a worker process)
+# The probation periods of all cases of the chunk are calculated at once (see workday_arrays.trial_stages),
+# errors are reported in the error column of their row
+def evaluate_chunk(chunk):
+    today = datetime.date.today()
+    results = [None] * len(chunk)
+    cases = {}
+    trial_inputs = {}
+    for index, row in enumerate(chunk):
+        try:
+            case = parse_case(row)
+            employment_sdt, termination_dt, incap_dct = engine.case_ordinals(case, today)
+            trial_inputs[index] = (employment_sdt, case.trial_months, case.workdays, case.canton,
+                                   engine.incapacity_stage(incap_dct), termination_dt)
+            cases[index] = case
+        except Exception as error:
+            results[index] = format_error(error)
+    try:
+        trial_outputs = dict(zip(trial_inputs, workday_arrays.trial_stages(list(trial_inputs.values()))))
+    except Exception:
+        # Calculate the probation periods case by case (e.g. reports the error of the failing case only)
+        trial_outputs = {}
+    for index, case in cases.items():
+        try:
+            run = engine.run_precomputed({engine.trial_stage: trial_outputs[index]}) if index in trial_outputs else engine.run_stage
+            results[index] = format_result(engine.evaluate(case, today, run=run), case.trial_months is not None)
+        except Exception as error:
+            results[index] = format_error(error)
+    return results
+
+# Function to split rows into lists of chunk_size rows
+def chunks(rows, chunk_size):
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        yield chunk
+
+# Function to evaluate input rows in parallel, one output row per input row in input order
+# At most two chunks per worker are in flight, i.e. memory use does not depend on the number of rows
+def evaluate_rows_parallel(rows, workers=None, chunk_size=CHUNK_SIZE):
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for chunk in chunks(rows, chunk_size):
+            pending.append((chunk, executor.submit(evaluate_chunk, chunk)))
+            while len(pending) > 2 * workers:
+                yield from collect_chunk(*pending.popleft())
+        while pending:
+            yield from collect_chunk(*pending.popleft())
+
+# Function to join a chunk of input rows with the results of its worker
+# Errors of the worker itself (e.g. a crashed process) are reported for each row of the chunk
+def collect_chunk(chunk, future):
+    try:
+        results = future.result()
+    except Exception as error:
+        results = [format_error(error)] * len(chunk)
+    for row, result in zip(chunk, results):
+        yield {**row, **result}
+
+
+# --- CSV --- #
+
+# Function to read rows from a CSV file one by one
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        yield from csv.DictReader(file)
+
+# Function to write rows to a CSV file one by one
+# Cells beyond the header of the input are dropped (the row is reported as error, see parse_case)
+def write_csv(path, rows, input_columns):
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=input_columns + OUTPUT_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: "" if value is None else value for key, value in row.items()})
+
+# Function to read the header of a CSV file
+def csv_columns(path):
+    with open(path, newline="", encoding="utf-8") as file:
+        return next(csv.reader(file))
+
+
+# --- PARQUET --- #
+
+# Function to import pyarrow, only required for Parquet files
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("Reading and writing Parquet files requires pyarrow (pip install pyarrow)") from error
+    return pyarrow
+
+# Function to read rows from a Parquet file batch by batch
+def read_parquet(path, batch_size=PARQUET_BATCH_SIZE):
+    pyarrow = import_pyarrow()
+    parquet_file = pyarrow.parquet.ParquetFile(path)
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+        yield from record_batch.to_pylist()
+
+# Function to write rows to a Parquet file batch by batch
+def write_parquet(path, rows, input_schema, batch_size=PARQUET_BATCH_SIZE):
+    pyarrow = import_pyarrow()
+    schema = input_schema
+    for name, data_type in [
+            ("termination_case", pyarrow.string()),
+            ("valid", pyarrow.bool_()),
+            ("new_employment_end", pyarrow.date32()),
+            ("trial_end", pyarrow.date32()),
+            ("notice_overlap", pyarrow.int64()),
+            ("embargo_periods", pyarrow.string()),
+            ("embargo_days", pyarrow.int64()),
+            ("sick_pay_periods", pyarrow.string()),
+            ("sick_pay_days", pyarrow.int64()),
+            ("error", pyarrow.string())]:
+        schema = schema.append(pyarrow.field(name, data_type))
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= batch_size:
+                writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+                chunk = []
+        if chunk:
+            writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+
+# Function to read the schema of a Parquet file
+def parquet_schema(path):
+    pyarrow = import_pyarrow()
+    return pyarrow.parquet.read_schema(path)
+
+
+# --- BATCH --- #
+
+# Function to check if a path refers to a Parquet file
+def is_parquet(path):
+    return str(path).lower().endswith((".parquet", ".pq"))
+
+# Function to evaluate all cases of an input file and write the results to an output file
+# Rows are streamed, i.e. memory use does not depend on the file size
+# Input columns named like output columns are replaced
+# Cases are spread over worker processes if more than one worker is requested (None: one per CPU)
+def run(input_path, output_path, workers=1, chunk_size=CHUNK_SIZE):
+    if is_parquet(input_path):
+        rows = read_parquet(input_path)
+    else:
+        rows = read_csv(input_path)
+    if workers == 1:
+        results = evaluate_rows(rows, chunk_size)
+    else:
+        results = evaluate_rows_parallel(rows, workers, chunk_size)
+    if is_parquet(output_path):
+        pyarrow = import_pyarrow()
+        if is_parquet(input_path):
+            input_schema = parquet_schema(input_path)
+        else:
+            input_schema = pyarrow.schema([(name, pyarrow.string()) for name in csv_columns(input_path)])
+        input_schema = pyarrow.schema([field for field in input_schema if field.name not in OUTPUT_COLUMNS])
+        write_parquet(output_path, results, input_schema)
+    else:
+        if is_parquet(input_path):
+            input_columns = parquet_schema(input_path).names
+        else:
+            input_columns = csv_columns(input_path)
+        input_columns = [name for name in input_columns if name not in OUTPUT_COLUMNS]
+        write_csv(output_path, results, input_columns)
+
+
+# --- COMMAND LINE --- #
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Evaluate termination cases in bulk (CSV or Parquet).")
+    parser.add_argument("input", help="input file (.csv or .parquet)")
+    parser.add_argument("output", help="output file (.csv or .parquet)")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (0: one per CPU, default: 1)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="cases per worker chunk (default: %(default)s)")
+    args = parser.parse_args()
+    run(args.input, args.output, workers=args.workers or None, chunk_size=args.chunk_size)
@@ -0,0 +1,91 @@
+import calendar
+import datetime
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# Day ordinals are plain integers as returned by datetime.date.toordinal()
+# Day 1 is 01.01.0001 (a Monday), adding or subtracting days is integer arithmetic
+
+
+# --- CONVERSION --- #
+
+# Function to convert a date to a day ordinal
+def to_ordinal(date):
+    return date.toordinal()
+
+# Function to convert a day ordinal to a date
+def to_date(day):
+    return datetime.date.fromordinal(day)
+
+
+# --- FUNCTIONS --- #
+
+# Function to get the weekday of a day ordinal (0 = Monday)
+def weekday(day):
+    return (day - 1) % 7
+
+# Function to get the day of the month of a day ordinal
+def day_of_month(day):
+    return datetime.date.fromordinal(day).day
+
+# Function to calculate time period duration in days, both days included
+def duration(start, end):
+    return end - start + 1
+
+# Function to shift a day ordinal by months
+# The day is capped at the end of the target month (e.g. 31.01. + 1 month = 28.02./29.02.)
+def shift_months(day, months):
+    date = datetime.date.fromordinal(day)
+    year, month = divmod(date.year * 12 + date.month - 1 + months, 12)
+    month += 1
+    return datetime.date(year, month, min(date.day, calendar.monthrange(year, month)[1])).toordinal()
+
+# Function to shift a day ordinal by years (29.02. + 1 year = 28.02.)
+def shift_years(day, years):
+    return shift_months(day, 12 * years)
+
+# Function to push a day ordinal to the last day of its week (sunday)
+def ceil_week(day):
+    return day + 6 - weekday(day)
+
+# Function to push a day ordinal to the last day of its month
+def ceil_month(day):
+    date = datetime.date.fromordinal(day)
+    return datetime.date(date.year, date.month, calendar.monthrange(date.year, date.month)[1]).toordinal()
+
+# Function to push a day ordinal to the last day of its quarter
+def ceil_quarter(day):
+    date = datetime.date.fromordinal(day)
+    month = (date.month - 1) // 3 * 3 + 3
+    return datetime.date(date.year, month, calendar.monthrange(date.year, month)[1]).toordinal()
+
+# Function to push a day ordinal to the last day of its year
+def ceil_year(day):
+    return datetime.date(datetime.date.fromordinal(day).year, 12, 31).toordinal()
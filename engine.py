@@ -0,0 +1,882 @@
+import datetime
+import copy
+from bisect import bisect_left, bisect_right
+from functools import lru_cache, partial
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Optional
+import holiday_calendar
+import workdays
+from intervals import IntervalSet
+from day_ordinals import to_ordinal, to_date, day_of_month, duration, shift_months, shift_years, ceil_week, ceil_month, ceil_quarter, ceil_year
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# --- CASE AND RESULT --- #
+
+# Incapacity types
+INCAPACITY_TYPES = ("illacc", "milservice", "preg")
+
+# Termination date (endpoint) options
+ENDPOINTS = ("month", "week", "quarter", "year", "anytime")
+
+# Ranges of the optional case parameters (as offered by the web interface)
+TRIAL_MONTHS = range(1, 4)
+NOTICE_MONTHS = range(1, 13)
+TRIAL_NOTICE_DAYS = range(0, 31)
+
+# Description of a single case, independent of any user interface
+# Dates are datetime.date objects, periods are (start, end) pairs with both dates included
+@dataclass
+class Case:
+    employment_start: datetime.date
+    canton: str
+    # None if no incapacity is evaluated
+    incapacity_type: Optional[str] = None
+    # One list of periods per (seperate) incapacity
+    incapacities: list = field(default_factory=list)
+    # None if no probation period is evaluated
+    trial_months: Optional[int] = None
+    # Weekday numbers of the workdays (0 = Monday)
+    workdays: tuple = (0, 1, 2, 3, 4)
+    # None if no termination is evaluated
+    termination_date: Optional[datetime.date] = None
+    # None if the notice period follows the legal minimum according to seniority
+    notice_months: Optional[int] = None
+    endpoint: str = "month"
+    trial_notice_days: int = 7
+
+# Function to check a case built outside the web interface (e.g. by batch.py or server.py)
+# Raises ValueError describing the first invalid input
+def validate_case(case):
+    if case.canton not in holiday_calendar.CANTONS:
+        raise ValueError("Unknown canton: " + str(case.canton))
+    if (case.incapacity_type is not None) and (case.incapacity_type not in INCAPACITY_TYPES):
+        raise ValueError("Unknown incapacity type: " + str(case.incapacity_type))
+    if case.endpoint not in ENDPOINTS:
+        raise ValueError("Unknown endpoint: " + str(case.endpoint))
+    if (case.termination_date is not None) and (case.termination_date < case.employment_start):
+        raise ValueError("The termination date cannot be before the employment start date")
+    for name, value, values in (("trial_months", case.trial_months, TRIAL_MONTHS),
+                                ("notice_months", case.notice_months, NOTICE_MONTHS),
+                                ("trial_notice_days", case.trial_notice_days, TRIAL_NOTICE_DAYS)):
+        if (value is not None) and (value not in values):
+            raise ValueError(name + " must be between " + str(values[0]) + " and " + str(values[-1]) + ", not " + str(value))
+    if (len(case.workdays) == 0) or (len(set(case.workdays)) != len(case.workdays)) or any(day not in range(7) for day in case.workdays):
+        raise ValueError("Workdays must be distinct weekday numbers from 0 (Monday) to 6 (Sunday), not " + str(list(case.workdays)))
+    for key, periods in enumerate(case.incapacities, start=1):
+        last_edt = None
+        for sdt, edt in periods:
+            if sdt > edt:
+                raise ValueError("Incapacity " + str(key) + ": the period " + sdt.isoformat() + "/" + edt.isoformat() + " ends before it starts")
+            if (last_edt is not None) and (sdt <= last_edt):
+                raise ValueError("Incapacity " + str(key) + ": the periods must be in chronological order and must not overlap")
+            last_edt = edt
+
+# Result of the evaluation of a case
+# Periods are lists of datetime.date objects ([start, end]), empty if not applicable
+@dataclass
+class Result:
+    # One of "no_case", "standard_case", "trial_case", "embargo_case"
+    termination_case: str
+    trial_period: list
+    trial_extension_days: int
+    regular_employment: list
+    notice_period: list
+    notice_compensation: list
+    notice_extension: list
+    notice_overlap: int
+    # None if no (valid) termination was evaluated
+    new_employment_end: Optional[datetime.date]
+    incapacity_periods: list
+    embargo_by_incapacity: dict
+    embargo_periods: list
+    sick_pay_periods: list
+    seniority_years: list
+
+    # None if no termination was evaluated
+    @property
+    def valid(self):
+        if self.termination_case == "no_case":
+            return None
+        return self.termination_case != "embargo_case"
+
+
+# --- FUNCTIONS --- #
+
+# Function to correct date subtraction if origin month has more days than target month
+# See issue 1
+def subtract_corr(sdt, edt):
+    if day_of_month(sdt) != day_of_month(edt):
+        return(edt)
+    else:
+        edt = edt - 1
+        return(edt)
+
+# Function to iterate lazily over the periods of several period lists, empty periods are skipped
+# E.g. the values of an incapacity or embargo dict
+def iter_periods(groups):
+    for periods in groups:
+        for period in periods:
+            if period != []:
+                yield period
+
+# Function to push dates to desired endpoint
+def push_endpoint(date, endpoint):
+    if endpoint == "month":
+        return ceil_month(date) # push to the end of the month
+    elif endpoint == "week":
+        return ceil_week(date) # push to the end of the week
+    elif endpoint == "quarter":
+        return ceil_quarter(date) # push to the end of the quarter
+    elif endpoint == "year":
+        return ceil_year(date) # push to the end of the year
+    else:
+        return date
+
+# Function to count the completed service years at a date (0 during the first year of service)
+# syears: sorted seniority thresholds (start of each service year)
+def completed_service_years(syears, date):
+    return bisect_right(syears, date) - 1
+
+# Function to get the service year of a date for sick pay (a threshold date still counts to the previous year)
+# Source: https://stackoverflow.com/a/70038244/14819955
+def sick_pay_service_year(syears, date):
+    return bisect_left(syears, date)
+
+# Function to get the embargo cap in days according to seniority
+def embargo_cap(syears, date):
+    service_years = completed_service_years(syears, date)
+    if service_years < 1:
+        return 30 # cap at 29 days incl. start and end date
+    elif service_years >= 5:
+        return 180 # cap at 180 days incl. start and end date
+    else:
+        return 90 # cap at 90 days incl. start and end date
+
+# Function to calculate time period duration in days
+def period_duration(start_date, end_date):
+    return (end_date - start_date).days + 1
+
+# Function to correct single dates
+def single_date(lst, first_index, last_index):
+    if lst[first_index] > lst[last_index]:
+        lst[first_index] = lst[last_index]
+        return lst
+
+# Function to merge overlapping date ranges, empty ranges (start after end) are dropped
+# Accepts any iterable of periods (e.g. a generator), returns new lists
+def merge(periods):
+    return IntervalSet(periods).periods()
+
+# Function to convert a list of day ordinals to dates
+def to_dates(lst):
+    return [to_date(value) for value in lst]
+
+
+# Function to convert nested lists and dicts into tuples (comparable, hashable stage inputs)
+def freeze(value):
+    if isinstance(value, dict):
+        return tuple((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# --- STAGES --- #
+
+# The evaluation is split into stages, each a function of its inputs only
+# Stages never modify their inputs, the outputs of a stage can be reused as long as its inputs are unchanged
+# All dates are handled as day ordinals (see day_ordinals.py)
+# List structure: unequal indicies indicate start dates, equal ones end dates (starts from index 0)
+# List manipulation is handled in pairs hereafter
+
+# Stage: seniority thresholds (start of each service year), shared by all cases with the same employment start
+@lru_cache(maxsize=1024)
+def seniority_stage(employment_sdt):
+    return tuple(shift_years(employment_sdt, i) for i in range(0, 35))
+
+# Stage: merged incapacity periods
+def incapacity_stage(incap_dct):
+    # Merge the periods of all incapacities
+    return merge(iter_periods(incap_dct.values()))
+
+# Stage: probation period incl. extension
+# Returns the probation period, the extension in workdays and the start of the regular employment
+def trial_stage(employment_sdt, trial_months, workdays_num, workplace, incap_masterlst, termination_dt):
+
+    trial_lst = [employment_sdt]
+    missed_workdays = 0
+    repeated_workdays = 0
+
+    # Check if user selected trial period evaluation
+    if trial_months is None:
+        return trial_lst, 0, employment_sdt
+
+    workday_mask = workdays.weekday_mask(workdays_num)
+
+    # Calculate probation period end date
+    trial_lst.insert(1, min(shift_months(trial_lst[0], trial_months), termination_dt)) # BGer 4C.45/2004
+    trial_lst[1] = subtract_corr(trial_lst[0], trial_lst[1])
+
+    # Check if any incapacity lies within probation period
+    trial_extension = any((incap_sublst[0] <= trial_lst[1]) and (incap_sublst[1] >= trial_lst[0]) for incap_sublst in incap_masterlst)
+
+    if trial_extension == True:
+
+        # Gather future holidays for 2 years
+        holidays = holiday_calendar.holidays_between(workplace, trial_lst[0], trial_lst[0] + 729)
+
+        for incap_sublst in incap_masterlst:
+
+            # Count working days missed during probation period
+            missed_workdays += workdays.count_workdays(max(trial_lst[0], incap_sublst[0]), min(trial_lst[1], incap_sublst[1]), workday_mask, holidays)
+
+            # Repeat missed working days during probation period extension (within one year after the incapacity)
+            extension_sdt = max(trial_lst[1], incap_sublst[1]) + 1
+            extension_workdays = min(missed_workdays - repeated_workdays, workdays.count_workdays(extension_sdt, extension_sdt + 364, workday_mask, holidays))
+            if extension_workdays > 0:
+                repeated_workdays += extension_workdays
+                trial_lst[1] = min(workdays.nth_workday(extension_sdt, extension_workdays, workday_mask, holidays), termination_dt) # cap at termination
+
+    # Regular employment starts after trial period
+    return trial_lst, missed_workdays, trial_lst[-1] + 1
+
+# Function to calculate the embargo periods of one incapacity due to illness or accident
+# The periods are capped according to seniority and split where a seniority threshold is crossed
+# Returns new lists, the incapacity periods are not modified
+# Removed periods are kept as empty lists, split periods follow their original period
+def illacc_embargo_periods(periods, reg_employment_sdt, syears):
+
+    embargo_lst = []
+
+    # Keep score of embargo days for the incapacity
+    embargo_cap_loop = 30 # start with lowest
+    embargo_claimed_loop = 0
+    embargo_unclaimed_loop = 0
+
+    for period in periods:
+
+        # Keep empty lists
+        if period == []:
+            embargo_lst.append([])
+            continue
+
+        embargo_sdt, embargo_edt = period
+
+        # Continue with next iteration if incapacitiy start date lies before the beginning of employment, empty sublist
+        if reg_employment_sdt >= embargo_edt:
+            embargo_lst.append([])
+            continue
+
+        # Set embargo cap according to seniority at beginning of incapacity
+        embargo_cap_loop = embargo_cap(syears, embargo_sdt)
+
+        # Skip if embargo_cap has been exceeded
+        if embargo_claimed_loop >= embargo_cap_loop:
+            embargo_lst.append([])
+            continue
+
+        # Count unclaimed days, max 1 since 1 day will be subtracted
+        embargo_unclaimed_loop = max(1, (embargo_cap_loop - embargo_claimed_loop))
+
+        # Set embargo start date
+        embargo_sdt = max(reg_employment_sdt, embargo_sdt) # starts on reg employment at the earliest
+
+        # Check if service year 1, 5 is crossed during embargo period, adjust embargo cap
+        if embargo_sdt <= syears[1] < embargo_edt:
+            crossed_syear = 1
+            embargo_cap_loop = 90 # cap at 90 days incl. start and end date
+        elif embargo_sdt <= syears[5] < embargo_edt:
+            crossed_syear = 5
+            embargo_cap_loop = 180 # cap at 180 days incl. start and end date
+        else:
+            # Set embargo end date, max date after cap is reached
+            embargo_edt = min(embargo_sdt + embargo_unclaimed_loop - 1, embargo_edt)
+            # Count used days
+            embargo_claimed_loop = duration(embargo_sdt, embargo_edt)
+            embargo_lst.append([embargo_sdt, embargo_edt])
+            continue
+
+        # Split embargo period if seniority threshold is crossed during embargo period
+        # Set end of first period, max one day before syear change
+        split_edt = min(embargo_sdt + embargo_unclaimed_loop - 1, syears[crossed_syear] - 1)
+        # Calculate used balance
+        embargo_claimed_loop += duration(embargo_sdt, split_edt)
+        # Count unclaimed days
+        embargo_unclaimed_loop = max(1, (embargo_cap_loop - embargo_claimed_loop))
+        # Second period starts at syear change
+        split_sdt = syears[crossed_syear]
+        # Set end of second period
+        embargo_edt = min(split_sdt + embargo_unclaimed_loop - 1, embargo_edt)
+        # Count used days
+        embargo_claimed_loop += duration(split_sdt, embargo_edt)
+
+        embargo_lst.append([embargo_sdt, split_edt])
+        embargo_lst.append([split_sdt, embargo_edt])
+
+    return embargo_lst
+
+# Function to calculate the embargo periods of one military or civil service
+# Returns the embargo periods and the sick pay (Erwerbsersatz) of the last service (None if there is none)
+def milservice_embargo_periods(periods, reg_employment_sdt):
+
+    embargo_lst = []
+    sickpay_lst = None
+
+    for embargo_sdt, embargo_edt in periods:
+
+        # Check if milservice duration was over 11 days
+        if duration(embargo_sdt, embargo_edt) > 11:
+            # Set embargo start to 4 weeks prior
+            embargo_sdt = embargo_sdt - 29
+            # Set embargo end to 4 weeks after
+            embargo_edt = embargo_edt + 29
+
+        # Delete if embargo ended before regular employment
+        if reg_employment_sdt >= embargo_edt:
+            embargo_lst.append([])
+            continue
+
+        # Set embargo beginning at start of reg employment
+        embargo_sdt = max(reg_employment_sdt, embargo_sdt)
+
+        embargo_lst.append([embargo_sdt, embargo_edt])
+        # Set sick pay (Erwerbsersatz) during milservice
+        sickpay_lst = [[embargo_sdt, embargo_edt]]
+
+    return embargo_lst, sickpay_lst
+
+# Function to calculate the embargo periods of one pregnancy
+# Returns the embargo periods and the sick pay (maternity pay) after the last confinement (None if there is none)
+def preg_embargo_periods(periods, reg_employment_sdt):
+
+    embargo_lst = []
+    sickpay_lst = None
+
+    for embargo_sdt, embargo_edt in periods:
+
+        # Set sick pay (maternity pay) to 14 weeks after confinement
+        sickpay_lst = [[embargo_edt, embargo_edt + 98]]
+
+        # Extend embargo to 16 weeks after confinement
+        embargo_edt = embargo_edt + 111
+
+        # Delete if embargo ended before regular employment
+        if reg_employment_sdt >= embargo_edt:
+            embargo_lst.append([])
+            continue
+
+        # Set embargo beginning at start of reg employment
+        embargo_lst.append([max(reg_employment_sdt, embargo_sdt), embargo_edt])
+
+    return embargo_lst, sickpay_lst
+
+# Stage: embargo periods by incapacity and merged
+# Returns the embargo periods by incapacity, the merged embargo periods and the sick pay dict (one key per service year)
+# with the pay during military service or after confinement
+# Any number of incapacities and periods is accepted, each period is handled once (seniority lookups by bisection)
+def embargo_stage(incapacity_type, incap_dct, reg_employment_sdt, syears):
+
+    # Populate sick pay dict with emtpy lists
+    sickpay_dct = {i: [] for i in range(0, 35)}
+
+
+    # --- CASE: ILLNESS OR ACCIDENT --- #
+
+    if incapacity_type == "illacc":
+        embargo_dct = {key: illacc_embargo_periods(value, reg_employment_sdt, syears) for key, value in incap_dct.items()}
+
+
+    # --- CASE: MILITARY OR CIVIL SERVICE / PREGNANCY --- #
+
+    elif incapacity_type in ("milservice", "preg"):
+        embargo_periods = milservice_embargo_periods if incapacity_type == "milservice" else preg_embargo_periods
+        embargo_dct = {}
+        for key, value in incap_dct.items():
+            embargo_dct[key], sickpay_lst = embargo_periods(value, reg_employment_sdt)
+            if sickpay_lst is not None:
+                sickpay_dct[1] = sickpay_lst
+
+    else:
+        embargo_dct = {key: [list(period) for period in value] for key, value in incap_dct.items()}
+
+
+    # --- Cleanup --- #
+
+    # Merge the embargo periods of all incapacities
+    embargo_masterlst = merge(iter_periods(embargo_dct.values()))
+
+    return embargo_dct, embargo_masterlst, sickpay_dct
+
+# Function to get the notice period in months
+# Legal minimum notice period according to seniority if no notice period was given
+def notice_period_months(termination_dt, notice_months, syears):
+    if notice_months is not None:
+        return notice_months
+    service_years = completed_service_years(syears, termination_dt)
+    if service_years < 1:
+        return 1
+    elif service_years >= 5:
+        return 3
+    else:
+        return 2
+
+# Stage: termination and notice period
+# Returns the end of the regular employment, the notice period, its compensation and extension,
+# the notice overlap in days and the new end of employment
+def notice_stage(termination_dt, notice_months, endpoint, incapacity_type, syears, embargo_masterlst):
+
+    reg_employment_edt = termination_dt
+    notice_period_lst = []
+    notice_comp_lst = []
+    notice_ext_lst = []
+
+    notice_period = notice_period_months(termination_dt, notice_months, syears)
+
+    # Calculate regular employment period end date
+    reg_employment_edt = push_endpoint(reg_employment_edt, endpoint)
+
+    # Determine notice period start date (BGE 134 III 354)
+    notice_period_lst.insert(0, reg_employment_edt + 1)
+
+    # Determine notice period end date
+    notice_period_lst.insert(1, shift_months(reg_employment_edt, notice_period))
+
+    # Push notice period end date if required
+    notice_period_lst[1] = push_endpoint(notice_period_lst[1], endpoint)
+
+    # Backwards check of notice period duration, truncate
+    while shift_months(notice_period_lst[0], notice_period) < notice_period_lst[1]:
+        notice_period_lst[0] = shift_months(notice_period_lst[0], 1)
+        reg_employment_edt = notice_period_lst[0] - 1
+
+    # Calculate new employment end date
+    new_employment_edt = notice_period_lst[-1]
+
+    # Set variables if no incaps were given
+    notice_overlap = 0
+
+    # Only calculate if incap has occured
+    if incapacity_type:
+
+        # Calculate total notice overlap, i.e. how many days of original notice period were missed
+        # Shift missed notice period days to the compensation period, handle consecutive interruptions
+        # One sweep over the embargo periods from the start of the notice period
+        notice_overlap, notice_comp_lst = IntervalSet(embargo_masterlst).suspend(notice_period_lst[0], notice_period_lst[1])
+
+        if notice_overlap != 0:
+
+            # Create extension if needed
+            if endpoint != "anytime":
+                notice_ext_lst.insert(0, notice_comp_lst[1] + 1)
+                notice_ext_lst.insert(1, push_endpoint(notice_comp_lst[1], endpoint))
+                single_date(notice_ext_lst, 0, 1)
+                new_employment_edt = notice_ext_lst[1]
+            else:
+                new_employment_edt = notice_comp_lst[1]
+
+    return reg_employment_edt, notice_period_lst, notice_comp_lst, notice_ext_lst, notice_overlap, new_employment_edt
+
+# Function to split the incapacity periods at the service years for sick pay
+# Yields the index of the service year and the period, the periods are not modified
+def split_sick_pay_periods(incap_dct, employment_sdt, syears):
+
+    # Sick pay starts max 3 months into employment
+    claim_sdt = shift_months(employment_sdt, 3)
+
+    for incap_sdt, incap_edt in iter_periods(incap_dct.values()):
+
+        # Skip periods that end before beginning of claim
+        if claim_sdt >= incap_edt:
+            continue
+
+        # Define sick pay start date
+        sickpay_sdt = max(claim_sdt, incap_sdt)
+
+        # Calculate seniority at the beginning and at the end of the incapacity
+        sick_pay_syear_start_index = sick_pay_service_year(syears, sickpay_sdt)
+        sick_pay_syear_end_index = sick_pay_service_year(syears, incap_edt)
+
+        # Compare seniority at start and end, split if not the same
+        if sick_pay_syear_start_index != sick_pay_syear_end_index: # not in the same year
+            # Split period after syear
+            yield sick_pay_syear_end_index, [syears[sick_pay_syear_start_index], incap_edt]
+            # Cap first period a day before syear
+            yield sick_pay_syear_start_index, [sickpay_sdt, min(incap_edt, syears[sick_pay_syear_start_index] - 1)]
+        else:
+            yield sick_pay_syear_start_index, [sickpay_sdt, incap_edt]
+
+# Stage: sick pay periods split by service year
+def sick_pay_split_stage(incapacity_type, employment_sdt, incap_dct, syears, sickpay_dct):
+
+    # New lists for each service year, the input dict is not modified
+    sickpay_dct = {key: list(value) for key, value in sickpay_dct.items()}
+
+    if incapacity_type == "illacc":
+        # Group into dict according to service year
+        for key, sickpay_sublst in split_sick_pay_periods(incap_dct, employment_sdt, syears):
+            sickpay_dct[key].append(sickpay_sublst)
+
+    return sickpay_dct
+
+# Sick pay matrix, starting after first year of service
+# Source: https://www.gerichte-zh.ch/themen/arbeit/waehrend-arbeitsverhaeltnis/arbeitsverhinderung/krankheit-und-unfall.html
+# Include placeholder for index 0 since it is 3 weeks for all cantons
+PAY_MATRIX = [
+    ["", 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42], # ZH (weeks)
+    ["", 1, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4, 4, 5, 5, 5, 5, 5, 6, 6 ,6, 6, 6 ,6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6], # BS / BL (months)
+    ["", 1, 2, 2, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 5, 5, 5, 5, 5, 6 ,6, 6, 6 ,6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6], # BE (months)
+]
+
+# Function to cap the sick pay periods of a service year
+# Yields the capped periods, periods after the cap has been reached are dropped
+def capped_sick_pay_periods(periods, syear, workplace, new_employment_edt):
+
+    # Choose sick pay duration
+    if workplace in ["ZH", "SH", "TG"]:
+        canton = 0
+        unit = "weeks"
+    elif workplace in ["BS", "BL"]:
+        canton = 1
+        unit = "months"
+    else:
+        canton = 2
+        unit = "months"
+
+    # Keep score of sick pay for the service year
+    sick_pay_claimed_loop = 0
+
+    for sickpay_sdt, sickpay_edt in iter_periods([periods]):
+
+        # Calculate sick pay according to service year
+        if syear == 1:
+            sick_pay_cap = duration(sickpay_sdt, sickpay_sdt + 20)
+        elif unit == "weeks":
+            # Add +1 to move query to the right index in sick pay matrix
+            sick_pay_cap = duration(sickpay_sdt, sickpay_sdt + 7 * PAY_MATRIX[canton][syear - 1] - 1)
+        else:
+            sick_pay_cap = duration(sickpay_sdt, shift_months(sickpay_sdt, PAY_MATRIX[canton][syear - 1]) - 1)
+
+        # Check if cap has been exceeded
+        if sick_pay_claimed_loop >= sick_pay_cap:
+            continue
+
+        # Calculate sick pay unclaimed
+        sick_pay_unclaimed_loop = max(1, (sick_pay_cap - sick_pay_claimed_loop))
+
+        # Set sick pay end date, cap sick pay at the earliest relevant occurence
+        sickpay_edt = min(sickpay_sdt + sick_pay_unclaimed_loop - 1, sickpay_edt, new_employment_edt)
+
+        # Count used sick days
+        sick_pay_claimed_loop += duration(sickpay_sdt, sickpay_edt)
+
+        yield [sickpay_sdt, sickpay_edt]
+
+# Stage: merged sick pay periods, capped per service year and at the end of employment
+def sick_pay_stage(incapacity_type, workplace, syears, sickpay_dct, new_employment_edt):
+
+    if incapacity_type == "illacc":
+        # Cap the periods of each service year and merge them
+        return merge(period for key, value in sickpay_dct.items()
+                     for period in capped_sick_pay_periods(value, key, workplace, new_employment_edt))
+
+    # Merge overlapping periods
+    return merge(iter_periods(sickpay_dct.values()))
+
+# Final stage: validity of the termination and cleanup, creates the result
+def outcome_stage(case, termination_dt, incapacity_type, trial_lst, trial_extension_dur, reg_employment_lst,
+                  notice_period_lst, notice_comp_lst, notice_ext_lst, notice_overlap, new_employment_edt,
+                  incap_masterlst, embargo_dct, embargo_masterlst, sickpay_masterlst, syears):
+
+    termination_occurence = case.termination_date is not None
+
+    # Work on copies, the inputs are stage outputs
+    trial_lst, reg_employment_lst, notice_period_lst, notice_comp_lst, notice_ext_lst, embargo_dct, embargo_masterlst, sickpay_masterlst = copy.deepcopy(
+        (trial_lst, reg_employment_lst, notice_period_lst, notice_comp_lst, notice_ext_lst, embargo_dct, embargo_masterlst, sickpay_masterlst))
+
+    # Standard case
+    # Termination during prbation period
+    if termination_occurence == False:
+        termination_case = "no_case"
+    # Termination without issue
+    if termination_occurence == True:
+        termination_case = "standard_case"
+    # Termination during trial
+    if (termination_occurence == True) and (trial_lst[0] <= termination_dt <= trial_lst[-1]):
+        termination_case = "trial_case"
+    # Termination during embargo period
+    if (termination_occurence == True) and incapacity_type:
+        for embargo_sublst in embargo_masterlst:
+            if embargo_sublst[0] <= termination_dt <= embargo_sublst[-1]:
+                termination_case = "embargo_case"
+                break
+
+
+    # --- Termination case: No case --- #
+
+    if termination_case == "no_case":
+        new_employment_edt = None
+
+    # --- Termination case: TERMINATION DURING TRIAL PERIOD --- #
+
+    # Adjust varibles
+    if termination_case == "trial_case":
+
+        # Set end of trial period to termination date
+        trial_lst[1:] = [termination_dt]
+        # Adjust notice period
+        notice_period_lst[0] = termination_dt + 1
+        notice_period_lst[1] = termination_dt + case.trial_notice_days
+        notice_ext_lst.clear()
+        notice_comp_lst.clear()
+        notice_overlap = 0
+        reg_employment_lst.clear()
+        embargo_dct.clear()
+        embargo_masterlst.clear()
+        new_employment_edt = notice_period_lst[-1]
+
+
+    # --- Termination case: TERMINATION DURING EMBARGO PERIOD --- #
+
+    # Adjust varibles
+    if termination_case == "embargo_case":
+        notice_period_lst.clear()
+        notice_overlap = 0
+        reg_employment_lst[1] = shift_years(reg_employment_lst[1], 3) # showing that employment continues
+        notice_comp_lst.clear()
+        notice_ext_lst.clear()
+        new_employment_edt = None
+
+    # --- Cleanup sick pay and embargo periods --- #
+    # Delete sick pay and embargo periods after valid termination, cap sick pay that surpasses end of employment
+    if (termination_case == "standard_case") or (termination_case == "trial_case"):
+        sickpay_masterlst = [[sickpay_sdt, min(sickpay_edt, new_employment_edt)] for sickpay_sdt, sickpay_edt in sickpay_masterlst if sickpay_sdt <= new_employment_edt]
+        embargo_masterlst = [embargo_sublst for embargo_sublst in embargo_masterlst if embargo_sublst[0] <= new_employment_edt]
+
+
+    # --- RESULT --- #
+
+    # Convert day ordinals to dates
+    return Result(
+        termination_case=termination_case,
+        trial_period=to_dates(trial_lst),
+        trial_extension_days=trial_extension_dur,
+        regular_employment=to_dates(reg_employment_lst),
+        notice_period=to_dates(notice_period_lst),
+        notice_compensation=to_dates(notice_comp_lst),
+        notice_extension=to_dates(notice_ext_lst),
+        notice_overlap=notice_overlap,
+        new_employment_end=to_date(new_employment_edt) if new_employment_edt is not None else None,
+        incapacity_periods=[to_dates(sublst) for sublst in incap_masterlst],
+        embargo_by_incapacity={key: [to_dates(sublst) for sublst in value] for key, value in embargo_dct.items()},
+        embargo_periods=[to_dates(sublst) for sublst in embargo_masterlst],
+        sick_pay_periods=[to_dates(sublst) for sublst in sickpay_masterlst],
+        seniority_years=to_dates(syears))
+
+
+# --- ENGINE --- #
+
+# Function to run a stage
+def run_stage(stage, *args):
+    return stage(*args)
+
+# Function to create a stage runner returning precomputed outputs for some stages ({stage: outputs}),
+# e.g. computed for many cases at once (see workday_arrays.trial_stages)
+def run_precomputed(outputs):
+    def run(stage, *args):
+        if stage in outputs:
+            return outputs[stage]
+        return stage(*args)
+    return run
+
+# Function to convert a case into the day ordinals the stages work on
+# Returns the employment start date, the termination date and the incapacities as dict (one key per incapacity)
+# "today" is only used to set the end of seniority if no termination is evaluated
+def case_ordinals(case, today=None):
+
+    employment_sdt = to_ordinal(case.employment_start)
+
+    # Set end of seniority to three years from today if no termination was issued
+    if case.termination_date is not None:
+        termination_dt = to_ordinal(case.termination_date)
+    else:
+        termination_dt = shift_years(to_ordinal(today or datetime.date.today()), 3)
+
+    # Sort incapacities into dict as list pairs, one key per incapacity
+    incap_dct = {}
+    for key, periods in enumerate(case.incapacities, start=1):
+        incap_dct[key] = [[to_ordinal(sdt), to_ordinal(edt)] for sdt, edt in periods]
+
+    return employment_sdt, termination_dt, incap_dct
+
+# Function to evaluate a case
+# "today" is only used to set the end of seniority if no termination is evaluated
+# "run" runs the stages, see IncrementalEvaluator and run_precomputed
+def evaluate(case, today=None, run=run_stage):
+
+    # --- DECLARE KNOWN VARIABLES, LISTS, DICTS --- #
+
+    employment_sdt, termination_dt, incap_dct = case_ordinals(case, today)
+    incapacity_type = case.incapacity_type
+
+    # --- STAGES --- #
+
+    syears = run(seniority_stage, employment_sdt)
+    incap_masterlst = run(incapacity_stage, incap_dct)
+    trial_lst, trial_extension_dur, reg_employment_sdt = run(
+        trial_stage, employment_sdt, case.trial_months, case.workdays, case.canton, incap_masterlst, termination_dt)
+    embargo_dct, embargo_masterlst, sickpay_dct = run(
+        embargo_stage, incapacity_type, incap_dct, reg_employment_sdt, syears)
+
+    # Check if user selected termination evaluation
+    if case.termination_date is not None:
+        reg_employment_edt, notice_period_lst, notice_comp_lst, notice_ext_lst, notice_overlap, new_employment_edt = run(
+            notice_stage, termination_dt, case.notice_months, case.endpoint, incapacity_type, syears, embargo_masterlst)
+    # Set termination date to regular employment endt date if no termination date was given
+    else:
+        reg_employment_edt, notice_period_lst, notice_comp_lst, notice_ext_lst, notice_overlap, new_employment_edt = termination_dt, [], [], [], 0, termination_dt
+
+    sickpay_dct = run(sick_pay_split_stage, incapacity_type, employment_sdt, incap_dct, syears, sickpay_dct)
+    sickpay_masterlst = run(sick_pay_stage, incapacity_type, case.canton, syears, sickpay_dct, new_employment_edt)
+
+    return outcome_stage(
+        case, termination_dt, incapacity_type, trial_lst, trial_extension_dur, [reg_employment_sdt, reg_employment_edt],
+        notice_period_lst, notice_comp_lst, notice_ext_lst, notice_overlap, new_employment_edt,
+        incap_masterlst, embargo_dct, embargo_masterlst, sickpay_masterlst, syears)
+
+
+# --- INCREMENTAL EVALUATION --- #
+
+# Evaluates a series of related cases incrementally, e.g. while a user edits the termination date of a session
+# (see work_calc.main) or the termination dates of a sweep (see sweep_termination_dates)
+# Keeps the last outputs of each stage with its inputs, stages are only run again if an input changed
+# E.g. a new termination date only reruns the notice period, the sick pay cap and the validity check,
+# a new incapacity does not rerun the seniority years
+class IncrementalEvaluator:
+
+    def __init__(self):
+        self.outputs = {}
+        # Number of stage runs and reuses (for inspection)
+        self.runs = 0
+        self.reuses = 0
+
+    # Function to reuse the last outputs of a stage if the inputs are unchanged, or else run it with run(stage, *args)
+    def reuse_or_run(self, run, stage, *args):
+        inputs = freeze(args)
+        last = self.outputs.get(stage.__name__)
+        if (last is not None) and (last[0] == inputs):
+            self.reuses += 1
+            return last[1]
+        self.runs += 1
+        outputs = run(stage, *args)
+        self.outputs[stage.__name__] = (inputs, outputs)
+        return outputs
+
+    # Function to evaluate a case, "run" runs the stages that cannot be reused (see evaluate)
+    def evaluate(self, case, today=None, run=run_stage):
+        return evaluate(case, today, partial(self.reuse_or_run, run))
+
+
+# --- WHAT-IF SWEEP --- #
+
+# Validity and resulting end of employment for a range of termination dates
+@dataclass
+class Sweep:
+    termination_dates: list
+    # One of "standard_case", "trial_case", "embargo_case" per termination date
+    termination_cases: list
+    valid: list
+    # None for invalid terminations
+    new_employment_ends: list
+
+    # Function to get the first valid termination date and the resulting end of employment, None if there is none
+    def earliest_valid(self):
+        for termination_date, valid, new_employment_end in zip(self.termination_dates, self.valid, self.new_employment_ends):
+            if valid:
+                return termination_date, new_employment_end
+        return None
+
+# Function to evaluate every termination date from start to end (both included) for a case
+# The termination date of the case is ignored
+# The stages not depending on the termination date run once (with the uncapped probation period), then each date is
+# looked up in the merged embargo periods by binary search and the notice period is computed once per notice period start
+# Termination dates up to the end of the probation period are evaluated completely (the probation period ends at the termination)
+def sweep_termination_dates(case, start, end):
+
+    employment_sdt = to_ordinal(case.employment_start)
+    incapacity_type = case.incapacity_type
+    incap_dct = {}
+    for key, periods in enumerate(case.incapacities, start=1):
+        incap_dct[key] = [[to_ordinal(sdt), to_ordinal(edt)] for sdt, edt in periods]
+
+    # Stages independent of the termination date
+    # Without termination the probation period is not capped (the horizon lies beyond all candidates)
+    horizon = max(shift_years(to_ordinal(end), 3), employment_sdt + 1)
+    syears = seniority_stage(employment_sdt)
+    incap_masterlst = incapacity_stage(incap_dct)
+    trial_lst, trial_extension_dur, reg_employment_sdt = trial_stage(
+        employment_sdt, case.trial_months, case.workdays, case.canton, incap_masterlst, horizon)
+    embargo_dct, embargo_masterlst, sickpay_dct = embargo_stage(incapacity_type, incap_dct, reg_employment_sdt, syears)
+
+    # Interval index over the merged embargo periods
+    embargo_set = IntervalSet(embargo_masterlst)
+
+    # End of employment by notice period start and duration
+    notice_ends = {}
+
+    # Candidates within the probation period
+    evaluator = IncrementalEvaluator()
+
+    sweep = Sweep([], [], [], [])
+    for termination_dt in range(to_ordinal(start), to_ordinal(end) + 1):
+
+        if termination_dt <= trial_lst[-1]:
+            result = evaluator.evaluate(dataclasses.replace(case, termination_date=to_date(termination_dt)))
+            termination_case = result.termination_case
+            new_employment_edt = result.new_employment_end
+        else:
+            if incapacity_type and embargo_set.contains(termination_dt):
+                termination_case = "embargo_case"
+                new_employment_edt = None
+            else:
+                termination_case = "standard_case"
+                key = (push_endpoint(termination_dt, case.endpoint), notice_period_months(termination_dt, case.notice_months, syears))
+                if key not in notice_ends:
+                    notice_ends[key] = to_date(notice_stage(
+                        termination_dt, case.notice_months, case.endpoint, incapacity_type, syears, embargo_masterlst)[-1])
+                new_employment_edt = notice_ends[key]
+
+        sweep.termination_dates.append(to_date(termination_dt))
+        sweep.termination_cases.append(termination_case)
+        sweep.valid.append(termination_case != "embargo_case")
+        sweep.new_employment_ends.append(new_employment_edt)
+
+    return sweep
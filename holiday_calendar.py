@@ -0,0 +1,236 @@
+import datetime
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+from dateutil.easter import easter
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# --- CANTONS --- #
+
+CANTONS = ("AG", "AI", "AR", "BS", "BL", "BE", "FR", "GE", "GL", "GR", "JU", "LU", "NE", "NW",
+           "OW", "SH", "SZ", "SO", "SG", "TG", "TI", "UR", "VS", "VD", "ZG", "ZH")
+
+
+# --- FUNCTIONS --- #
+
+# Function to shift a date to the next given weekday (including the date itself)
+def next_weekday(date, weekday):
+    return date + datetime.timedelta(days=(weekday - date.weekday()) % 7)
+
+
+# --- HOLIDAY RULES --- #
+
+# Each rule: name, function returning the date for a given year and easter date, cantons
+# Source: https://www.bj.admin.ch/dam/bj/de/data/publiservice/service/zivilprozessrecht/kant-feiertage.pdf
+HOLIDAY_RULES = [
+    ("Neujahrstag",
+        lambda year, easter_dt: datetime.date(year, 1, 1),
+        CANTONS),
+    ("Berchtoldstag",
+        lambda year, easter_dt: datetime.date(year, 1, 2),
+        ["ZH", "BE", "LU", "OW", "NW", "GL", "ZG", "FR", "SO", "SH", "SG", "AG", "TG", "VD", "VS", "NE", "JU"]),
+    ("Heilige Drei Könige",
+        lambda year, easter_dt: datetime.date(year, 1, 6),
+        ["UR", "SZ", "TI"]),
+    ("Jahrestag der Ausrufung der Republik Neuenburg",
+        lambda year, easter_dt: datetime.date(year, 3, 1),
+        ["NE"]),
+    ("Josefstag",
+        lambda year, easter_dt: datetime.date(year, 3, 19),
+        ["UR", "SZ", "NW", "SO", "TI", "VS"]),
+    ("Karfreitag",
+        lambda year, easter_dt: easter_dt - datetime.timedelta(days=2),
+        ["ZH", "BE", "LU", "UR", "SZ", "OW", "NW", "GL", "ZG", "FR", "SO", "BS", "BL", "SH", "AR", "AI", "SG", "GR", "AG", "TG", "VD", "NE", "GE", "JU"]),
+    ("Ostermontag",
+        lambda year, easter_dt: easter_dt + datetime.timedelta(days=1),
+        ["ZH", "BE", "LU", "UR", "SZ", "OW", "NW", "GL", "ZG", "FR", "SO", "BS", "BL", "SH", "AR", "AI", "SG", "GR", "AG", "TG", "TI", "VD", "VS", "GE", "JU"]),
+    ("Fahrtsfest",
+        lambda year, easter_dt: next_weekday(datetime.date(year, 4, 1), 4),
+        ["GL"]),
+    ("Tag der Arbeit",
+        lambda year, easter_dt: datetime.date(year, 5, 1),
+        ["ZH", "BS", "BL", "SH", "AG", "TG", "TI", "NE", "JU"]),
+    ("Auffahrt",
+        lambda year, easter_dt: easter_dt + datetime.timedelta(days=39),
+        ["ZH", "BE", "LU", "UR", "SZ", "OW", "NW", "GL", "ZG", "FR", "SO", "BS", "BL", "SH", "AR", "AI", "SG", "GR", "AG", "TG", "TI", "VD", "VS", "NE", "GE", "JU"]),
+    ("Pfingstmontag",
+        lambda year, easter_dt: easter_dt + datetime.timedelta(days=50),
+        ["ZH", "BE", "LU", "UR", "SZ", "OW", "NW", "GL", "ZG", "FR", "SO", "BS", "BL", "SH", "AR", "AI", "SG", "GR", "AG", "TG", "TI", "VD", "VS", "GE", "JU"]),
+    ("Frohnleichnam",
+        lambda year, easter_dt: easter_dt + datetime.timedelta(days=60),
+        ["LU", "UR", "SZ", "OW", "NW", "ZG", "FR", "SO", "AI", "AG", "TI", "VS", "NE", "JU"]),
+    ("Commémoration du plébiscite jurassien",
+        lambda year, easter_dt: datetime.date(year, 6, 23),
+        ["JU"]),
+    ("Peter und Paul",
+        lambda year, easter_dt: datetime.date(year, 6, 29),
+        ["TI"]),
+    ("Bundesfeier",
+        lambda year, easter_dt: datetime.date(year, 8, 1),
+        CANTONS),
+    ("Mariä Himmelfahrt",
+        lambda year, easter_dt: datetime.date(year, 8, 15),
+        ["LU", "UR", "SZ", "OW", "NW", "ZG", "FR", "SO", "AI", "AG", "TI", "VS", "JU"]),
+    ("Jeûne genevois",
+        lambda year, easter_dt: next_weekday(next_weekday(datetime.date(year, 9, 1), 6), 4),
+        ["GE"]),
+    ("Mauritiustag",
+        lambda year, easter_dt: datetime.date(year, 9, 25),
+        ["AI"]),
+    ("Bruderklausenfest",
+        lambda year, easter_dt: datetime.date(year, 9, 25),
+        ["OW"]),
+    ("Allerheiligen",
+        lambda year, easter_dt: datetime.date(year, 11, 1),
+        ["LU", "UR", "SZ", "OW", "NW", "GL", "ZG", "FR", "SO", "AI", "SG", "AG", "TI", "VS", "JU"]),
+    ("Mariä Empfängnis",
+        lambda year, easter_dt: datetime.date(year, 12, 8),
+        ["LU", "UR", "SZ", "OW", "NW", "ZG", "FR", "AI", "AG", "TI", "VS"]),
+    ("Weihnachtstag",
+        lambda year, easter_dt: datetime.date(year, 12, 25),
+        CANTONS),
+    ("Stephanstag",
+        lambda year, easter_dt: datetime.date(year, 12, 26),
+        ["ZH", "BE", "LU", "UR", "SZ", "OW", "NW", "GL", "ZG", "FR", "BS", "BL", "SH", "AR", "AI", "SG", "GR", "AG", "TG", "TI", "VS", "NE"]),
+    ("Restauration de la République",
+        lambda year, easter_dt: datetime.date(year, 12, 31),
+        ["GE"]),
+]
+
+
+# --- HOLIDAY TABLE --- #
+
+# Function to compute the set of holidays (as day ordinals) for a canton and year from the rules
+def compute_holidays(canton, year):
+    easter_dt = easter(year)
+    return frozenset(
+        rule(year, easter_dt).toordinal()
+        for name, rule, cantons in HOLIDAY_RULES
+        if canton in cantons)
+
+
+# --- PRECOMPUTED HOLIDAYS --- #
+
+# The holidays of all cantons from FIRST_YEAR to LAST_YEAR are precomputed into a binary file by running this module
+# (python holiday_calendar.py), the file has to be rebuilt after changing the rules
+# Layout: header, then one bitset per canton (in the order of CANTONS) and year, bit n is set if day n of the year
+# (0 = 01.01.) is a holiday
+# The file is mapped into memory (mmap) on import: lookups only read bits and the pages are shared between processes
+# Years outside the range (or a missing file) fall back to the rules
+FIRST_YEAR = 1950
+LAST_YEAR = 2100
+HOLIDAY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "holidays.bin")
+HEADER = struct.Struct("<6sHH52s2x") # magic, first year, last year, cantons
+MAGIC = b"WCHOL1"
+BLOCK_SIZE = 48 # 366 bits, rounded up
+
+# Function to get the position of the bitset of a canton and year in the file
+def block_offset(canton, year):
+    return HEADER.size + (CANTONS.index(canton) * (LAST_YEAR - FIRST_YEAR + 1) + year - FIRST_YEAR) * BLOCK_SIZE
+
+# Function to write the holiday file, replaces an existing file atomically (mapped copies stay valid)
+def build_holiday_file(path=HOLIDAY_FILE):
+    with open(path + ".tmp", "wb") as file:
+        file.write(HEADER.pack(MAGIC, FIRST_YEAR, LAST_YEAR, "".join(CANTONS).encode("ascii")))
+        for canton in CANTONS:
+            for year in range(FIRST_YEAR, LAST_YEAR + 1):
+                first_day = datetime.date(year, 1, 1).toordinal()
+                bits = sum(1 << (day - first_day) for day in compute_holidays(canton, year))
+                file.write(bits.to_bytes(BLOCK_SIZE, "little"))
+    os.replace(path + ".tmp", path)
+
+# Function to map the holiday file into memory
+# Returns None if the file is missing or does not match the year range and cantons
+def load_holiday_file(path=HOLIDAY_FILE):
+    try:
+        with open(path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError): # missing or empty file
+        return None
+    if (len(data) != HEADER.size + len(CANTONS) * (LAST_YEAR - FIRST_YEAR + 1) * BLOCK_SIZE
+            or HEADER.unpack_from(data) != (MAGIC, FIRST_YEAR, LAST_YEAR, "".join(CANTONS).encode("ascii"))):
+        data.close()
+        return None
+    return data
+
+# Mapped holiday file, None if not available
+precomputed = load_holiday_file()
+
+# Function to check if the holidays of a canton and year are in the holiday file
+def is_precomputed(canton, year):
+    return (precomputed is not None) and (FIRST_YEAR <= year <= LAST_YEAR) and (canton in CANTONS)
+
+# Function to read the holidays (as day ordinals) of a canton and year from the holiday file
+def read_holidays(canton, year):
+    first_day = datetime.date(year, 1, 1).toordinal()
+    offset = block_offset(canton, year)
+    bits = int.from_bytes(precomputed[offset:offset + BLOCK_SIZE], "little")
+    days = []
+    while bits:
+        lowest = bits & -bits
+        days.append(first_day + lowest.bit_length() - 1)
+        bits ^= lowest
+    return frozenset(days)
+
+
+# --- LOOKUPS --- #
+
+# Function to get the set of holidays (as day ordinals) for a canton and year
+# Read from the holiday file if available, computed from the rules otherwise, cached afterwards
+@lru_cache(maxsize=None)
+def holiday_table(canton, year):
+    if is_precomputed(canton, year):
+        return read_holidays(canton, year)
+    return compute_holidays(canton, year)
+
+# Function to check if a given date is a holiday
+# Accepts date, datetime and arrow objects
+def is_holiday(day, canton):
+    if is_precomputed(canton, day.year):
+        day_of_year = day.toordinal() - datetime.date(day.year, 1, 1).toordinal()
+        return bool(precomputed[block_offset(canton, day.year) + day_of_year // 8] >> (day_of_year % 8) & 1)
+    return day.toordinal() in holiday_table(canton, day.year)
+
+# Function to list all holidays (as day ordinals) between two day ordinals, both included
+def holidays_between(canton, start, end):
+    return sorted(
+        day
+        for year in range(datetime.date.fromordinal(start).year, datetime.date.fromordinal(end).year + 1)
+        for day in holiday_table(canton, year)
+        if start <= day <= end)
+
+
+# --- BUILD --- #
+
+if __name__ == "__main__":
+    build_holiday_file(sys.argv[1] if len(sys.argv) > 1 else HOLIDAY_FILE)
@@ -0,0 +1,105 @@
+from bisect import bisect_left, bisect_right
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# --- INTERVAL SET --- #
+
+# Set of closed intervals ([start, end], both included) over day ordinals (see day_ordinals.py)
+# Intervals are kept merged and sorted in two parallel lists of starts and ends
+# Intervals sharing at least one day are merged, adjacent intervals (end + 1 = start) are kept apart
+# Empty intervals (start > end) are dropped
+class IntervalSet:
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        intervals = [interval for interval in intervals if interval[0] <= interval[1]]
+        # Only sort if required (stage outputs are already sorted)
+        if any(intervals[i][0] > intervals[i + 1][0] for i in range(len(intervals) - 1)):
+            intervals.sort(key=lambda interval: interval[0])
+        for start, end in intervals:
+            self.add_sorted(start, end)
+
+    # Function to append an interval starting at or after the start of the last interval
+    def add_sorted(self, start, end):
+        if self.ends and (start <= self.ends[-1]):
+            self.ends[-1] = max(self.ends[-1], end)
+        else:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __eq__(self, other):
+        return isinstance(other, IntervalSet) and (self.starts == other.starts) and (self.ends == other.ends)
+
+    def __repr__(self):
+        return "IntervalSet(" + repr(self.periods()) + ")"
+
+    # Function to get the intervals as list of [start, end] lists
+    def periods(self):
+        return [[start, end] for start, end in self]
+
+    # Function to check if a day lies within an interval
+    def contains(self, day):
+        index = bisect_right(self.starts, day) - 1
+        return (index >= 0) and (day <= self.ends[index])
+
+    # Function to suspend a period by the intervals in one sweep from the start of the period
+    # Returns the days of the period lying within the intervals and the compensation period appended to the period,
+    # or an empty list if no days lie within the intervals
+    # The compensation period grows: every interval overlapping it extends its end to the end of the interval plus the overlap length
+    def suspend(self, start, end):
+        overlap = 0
+        index = bisect_left(self.ends, start)
+        # First interval reaching beyond the period
+        grow_index = None
+        while (index < len(self)) and (self.starts[index] <= end):
+            overlap += min(end, self.ends[index]) - max(start, self.starts[index]) + 1
+            if (grow_index is None) and (self.ends[index] > end):
+                grow_index = index
+            index += 1
+        if overlap == 0:
+            return 0, []
+        if grow_index is None:
+            grow_index = index
+        compensation_start = end + 1
+        compensation_end = end + overlap
+        while (grow_index < len(self)) and (self.starts[grow_index] <= compensation_end):
+            overlap_length = max(0, min(compensation_end, self.ends[grow_index]) - max(compensation_start, self.starts[grow_index]) + 1)
+            compensation_end = max(compensation_end, self.ends[grow_index]) + overlap_length
+            grow_index += 1
+        return overlap, [compensation_start, compensation_end]
@@ -0,0 +1,224 @@
+from bisect import bisect_left
+import itertools
+import mmap
+import time
+import engine
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# Stage timings and case counters of the server, exposed in the Prometheus text format (GET /metrics, see server.py)
+# All values live in shared memory allocated before the workers are forked (see setup), each worker adds to its own block
+# and /metrics reports the sum of all blocks, so every worker answers with the totals of the server
+
+
+# --- SETTINGS --- #
+
+# Upper bounds of the histogram buckets in seconds (from engine stages to input waits)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# Timed stages: the input of a web session, the engine stages (see engine.evaluate), a whole evaluation
+# (incl. waiting for the executor), a sweep and the output of a web session
+STAGES = (
+    "input",
+    "seniority_stage", "incapacity_stage", "trial_stage", "embargo_stage", "notice_stage", "sick_pay_split_stage", "sick_pay_stage",
+    "evaluation",
+    "sweep",
+    "render",
+)
+
+# Counted case types
+TERMINATION_CASES = ("no_case", "standard_case", "trial_case", "embargo_case")
+INCAPACITY_TYPES = ("none",) + engine.INCAPACITY_TYPES
+
+
+# --- SHARED VALUES --- #
+
+# Float values in anonymous shared memory (inherited by forked workers), one block of size values per worker
+class SharedValues:
+
+    def __init__(self, size, workers=1):
+        self.size = size
+        self.workers = workers
+        self.buffer = mmap.mmap(-1, 8 * size * workers)
+        self.values = memoryview(self.buffer).cast("d")
+        self.block = 0
+
+    # Function to select the block of a worker (0 to workers - 1)
+    def select(self, worker):
+        self.block = worker * self.size
+
+    # Function to add to a value of the selected block
+    def add(self, index, amount):
+        self.values[self.block + index] += amount
+
+    # Function to sum up the values of all blocks
+    def totals(self):
+        totals = [0.0] * self.size
+        for block in range(0, self.size * self.workers, self.size):
+            for index in range(self.size):
+                totals[index] += self.values[block + index]
+        return totals
+
+
+# --- METRICS --- #
+
+# Function to format labels, e.g. {stage="trial_stage"}
+def format_labels(names, values):
+    return "{" + ",".join(name + '="' + value + '"' for name, value in zip(names, values)) + "}"
+
+# Function to format a value, counts without decimals
+def format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+# Counter with a fixed set of label values
+class Counter:
+
+    def __init__(self, name, description, labels, label_values):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.index = {values: index for index, values in enumerate(label_values)}
+        self.size = len(self.index)
+        self.offset = 0
+
+    # Function to increase the counter of the given label values
+    def inc(self, label_values, amount=1):
+        shared.add(self.offset + self.index[label_values], amount)
+
+    # Function to create the lines of the text format from the summed up values
+    def render(self, totals):
+        lines = ["# HELP " + self.name + " " + self.description, "# TYPE " + self.name + " counter"]
+        for label_values, index in self.index.items():
+            lines.append(self.name + format_labels(self.labels, label_values) + " " + format_value(totals[self.offset + index]))
+        return lines
+
+# Histogram with a fixed set of label values
+# Per label values: one count per bucket (not cumulative), the sum and the count of all observations
+class Histogram:
+
+    def __init__(self, name, description, labels, label_values, buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.index = {values: index for index, values in enumerate(label_values)}
+        self.size = len(self.index) * (len(buckets) + 2)
+        self.offset = 0
+
+    # Function to record an observation for the given label values
+    def observe(self, label_values, value):
+        start = self.offset + self.index[label_values] * (len(self.buckets) + 2)
+        bucket = bisect_left(self.buckets, value)
+        if bucket < len(self.buckets):
+            shared.add(start + bucket, 1)
+        shared.add(start + len(self.buckets), value)
+        shared.add(start + len(self.buckets) + 1, 1)
+
+    # Function to create the lines of the text format from the summed up values
+    def render(self, totals):
+        lines = ["# HELP " + self.name + " " + self.description, "# TYPE " + self.name + " histogram"]
+        for label_values, index in self.index.items():
+            start = self.offset + index * (len(self.buckets) + 2)
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0.0
+            for bucket, bound in enumerate(self.buckets):
+                cumulative += totals[start + bucket]
+                lines.append(self.name + "_bucket" + format_labels(self.labels + ("le",), label_values + (repr(bound),)) + " " + format_value(cumulative))
+            lines.append(self.name + "_bucket" + format_labels(self.labels + ("le",), label_values + ("+Inf",)) + " " + format_value(totals[start + len(self.buckets) + 1]))
+            lines.append(self.name + "_sum" + labels + " " + format_value(totals[start + len(self.buckets)]))
+            lines.append(self.name + "_count" + labels + " " + format_value(totals[start + len(self.buckets) + 1]))
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "work_calc_stage_seconds", "Duration of the stages of sessions and requests in seconds.",
+    ("stage",), [(stage,) for stage in STAGES])
+
+CASES = Counter(
+    "work_calc_cases_total", "Evaluated cases by termination case and incapacity type.",
+    ("termination_case", "incapacity_type"), list(itertools.product(TERMINATION_CASES, INCAPACITY_TYPES)))
+
+METRICS = [STAGE_SECONDS, CASES]
+
+# Assign the values of each metric within a block
+size = 0
+for metric in METRICS:
+    metric.offset = size
+    size += metric.size
+
+# Values of a single process, see setup
+shared = SharedValues(size)
+
+
+# --- FUNCTIONS --- #
+
+# Function to allocate the values for a number of workers, call before forking them (see server.serve)
+def setup(workers):
+    global shared
+    shared = SharedValues(size, workers)
+
+# Function to select the block of the current worker (see server.fork_workers), call after forking
+def select_worker(worker):
+    shared.select(worker)
+
+# Function to record the duration of a stage
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe((stage,), seconds)
+
+# Function to record the duration of the stages of an evaluation, see timed_evaluate
+def observe_stages(timings):
+    for stage, seconds in timings:
+        observe_stage(stage, seconds)
+
+# Function to count an evaluated case
+def count_case(case, result):
+    CASES.inc((result.termination_case, case.incapacity_type or "none"))
+
+# Function to evaluate a case and time its stages, e.g. in the executor (the caller records the timings)
+# With an evaluator (see engine.IncrementalEvaluator) only the stages run again are timed
+# Returns the result and a list of (stage name, seconds)
+def timed_evaluate(case, today=None, evaluator=None):
+    timings = []
+    def run(stage, *args):
+        start = time.perf_counter()
+        outputs = stage(*args)
+        timings.append((stage.__name__, time.perf_counter() - start))
+        return outputs
+    if evaluator is not None:
+        return evaluator.evaluate(case, today, run=run), timings
+    return engine.evaluate(case, today, run=run), timings
+
+# Function to create the text format of all metrics (summed up over all workers)
+def render():
+    totals = shared.totals()
+    lines = []
+    for metric in METRICS:
+        lines += metric.render(totals)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,172 @@
+import collections
+import copy
+import dataclasses
+import datetime
+import hashlib
+import json
+import threading
+import time
+import engine
+import metrics
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# --- SETTINGS --- #
+
+# Maximum number of cached entries per cache
+CACHE_SIZE = 4096
+
+# Seconds after which a cached entry expires
+CACHE_TTL = 3600
+
+
+# --- CACHE --- #
+
+# Bounded cache, least recently used entries are dropped first, entries expire after ttl seconds
+# Used from the event loop of a serving process (coroutine sessions and JSON handlers), each worker process has its own caches
+# The evaluations run in the executor, only their results are stored here
+# The lock keeps the cache consistent if it is also used from threads (e.g. evaluate in own scripts)
+class LRUCache:
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    # Function to look up a key, returns default if missing or expired
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if (entry is None) or (entry[0] < time.monotonic()):
+                self.entries.pop(key, None)
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    # Function to store a value, drops the least recently used entry if full
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    # Function to look up a key, computes and stores the value if missing
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    # Function to look up a key, awaits compute() and stores the value if missing
+    async def get_or_compute_async(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = await compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+
+# --- FUNCTIONS --- #
+
+# Function to normalize a case into plain JSON values (dates as "YYYY-MM-DD", periods as lists)
+# Workdays are sorted and deduplicated, their order does not matter
+def normalize_case(case):
+    data = dataclasses.asdict(case)
+    data["incapacities"] = [[[sdt.isoformat(), edt.isoformat()] for sdt, edt in incapacity] for incapacity in case.incapacities]
+    data["workdays"] = sorted(set(case.workdays))
+    return data
+
+# Function to create a canonical hash of a case and further inputs (e.g. the language)
+def case_key(case, *extra):
+    data = json.dumps([normalize_case(case), *extra], default=str, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+# Function to set the date an evaluation depends on (only without termination, see engine.evaluate)
+def evaluation_date(case, today=None):
+    if case.termination_date is not None:
+        return None
+    return today or datetime.date.today()
+
+
+# --- CACHES --- #
+
+# Engine results
+results = LRUCache()
+
+# Rendered HTML fragments (e.g. the timeline chart)
+fragments = LRUCache()
+
+# Function to evaluate a case, cached
+# Returns a copy, callers may modify the result
+def evaluate(case, today=None):
+    today = evaluation_date(case, today)
+    result = results.get_or_compute(case_key(case, today), lambda: engine.evaluate(case, today))
+    return copy.deepcopy(result)
+
+# Function to evaluate a case with run(function, *args), e.g. in an executor (see server.run_in_executor), cached
+# With an evaluator (see engine.IncrementalEvaluator) run must call the function in this process (e.g. in a thread)
+# The case type and the durations of evaluations (not cached) are recorded, see metrics.py
+# Returns a copy, callers may modify the result
+async def evaluate_async(case, run, today=None, evaluator=None):
+    today = evaluation_date(case, today)
+
+    async def compute():
+        start = time.perf_counter()
+        result, timings = await run(metrics.timed_evaluate, case, today, evaluator)
+        metrics.observe_stages(timings)
+        metrics.observe_stage("evaluation", time.perf_counter() - start)
+        return result
+
+    result = await results.get_or_compute_async(case_key(case, today), compute)
+    metrics.count_case(case, result)
+    return copy.deepcopy(result)
+
+# Function to render a HTML fragment, cached
+def render(key, render_fragment):
+    return fragments.get_or_compute(key, render_fragment)
+
+# Function to get the hit/miss counters of all caches
+def stats():
+    return {"results": results.stats(), "fragments": fragments.stats()}
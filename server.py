@@ -0,0 +1,448 @@
+import argparse
+import asyncio
+import concurrent.futures
+import gc
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import tornado.httpserver
+import tornado.log
+import tornado.netutil
+import tornado.process
+import tornado.web
+from pywebio import STATIC_PATH
+from pywebio.platform.tornado import webio_handler
+import assets
+import batch
+import engine
+import holiday_calendar
+import metrics
+import result_cache
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# --- SETTINGS --- #
+
+# Maximum number of cases per batch request
+MAX_BATCH_SIZE = 1000
+
+# Maximum number of termination dates per sweep request
+MAX_SWEEP_DAYS = 3660
+
+# Maximum request body size in bytes
+MAX_BODY_SIZE = 2 ** 20 * 10
+
+
+# --- FUNCTIONS --- #
+
+# Function to parse a period of a JSON case ([start, end])
+def parse_period(period):
+    if not (isinstance(period, list) and len(period) == 2):
+        raise ValueError("A period must be a list of a start and an end date: " + json.dumps(period))
+    return batch.parse_date(period[0]), batch.parse_date(period[1])
+
+# Function to parse the incapacities of a JSON case (list of incapacities, each a list of periods)
+def parse_incapacities(incapacities):
+    if not (isinstance(incapacities, list) and all(isinstance(incapacity, list) for incapacity in incapacities)):
+        raise ValueError("Incapacities must be a list of incapacities, each a list of periods")
+    return [[parse_period(period) for period in incapacity] for incapacity in incapacities]
+
+# Function to build a case from a JSON object
+# - dates: "YYYY-MM-DD" or "DD.MM.YYYY"
+# - incapacities: list of incapacities, each a list of [start, end] periods
+# - workdays: list of weekday numbers (0 = Monday)
+# The case is checked as those of the batch evaluation (see engine.validate_case)
+def parse_case(data):
+    if not isinstance(data, dict):
+        raise ValueError("A case must be a JSON object")
+    for key in ("employment_start", "canton"):
+        if key not in data:
+            raise ValueError("Missing field: " + key)
+    workdays = data.get("workdays", [0, 1, 2, 3, 4])
+    if not isinstance(workdays, list):
+        raise ValueError("Workdays must be a list of weekday numbers")
+    termination_date = data.get("termination_date")
+    case = engine.Case(
+        employment_start=batch.parse_date(data["employment_start"]),
+        canton=data["canton"],
+        incapacity_type=data.get("incapacity_type"),
+        incapacities=parse_incapacities(data.get("incapacities", [])),
+        trial_months=batch.parse_int(data.get("trial_months")),
+        workdays=tuple(int(day) for day in workdays),
+        termination_date=None if termination_date is None else batch.parse_date(termination_date),
+        notice_months=batch.parse_int(data.get("notice_months")),
+        endpoint=data.get("endpoint", "month"),
+        trial_notice_days=batch.parse_int(data.get("trial_notice_days"), 7))
+    engine.validate_case(case)
+    return case
+
+# Function to format a date as "YYYY-MM-DD"
+def format_date(date):
+    return None if date is None else date.isoformat()
+
+# Function to format a period ([start, end]) or an empty list
+def format_period(period):
+    return [format_date(date) for date in period]
+
+# Function to format a list of periods
+def format_periods(periods):
+    return [format_period(period) for period in periods]
+
+# Function to build a JSON object from a result
+def format_result(result):
+    return {
+        "termination_case": result.termination_case,
+        "valid": result.valid,
+        "new_employment_end": format_date(result.new_employment_end),
+        "trial_period": format_period(result.trial_period),
+        "trial_extension_days": result.trial_extension_days,
+        "regular_employment": format_period(result.regular_employment),
+        "notice_period": format_period(result.notice_period),
+        "notice_compensation": format_period(result.notice_compensation),
+        "notice_extension": format_period(result.notice_extension),
+        "notice_overlap": result.notice_overlap,
+        "incapacity_periods": format_periods(result.incapacity_periods),
+        "embargo_by_incapacity": {str(key): format_periods(value) for key, value in result.embargo_by_incapacity.items()},
+        "embargo_periods": format_periods(result.embargo_periods),
+        "sick_pay_periods": format_periods(result.sick_pay_periods),
+        "seniority_years": [format_date(date) for date in result.seniority_years],
+    }
+
+# Function to evaluate a single JSON case in the executor, errors are reported as {"error": ...}
+async def evaluate_case(data):
+    try:
+        return format_result(await result_cache.evaluate_async(parse_case(data), run_in_executor))
+    except Exception as error:
+        return {"error": type(error).__name__ + ": " + str(error)}
+
+
+# Function to build a JSON object from a sweep
+def format_sweep(sweep):
+    earliest_valid = sweep.earliest_valid()
+    return {
+        "earliest_valid": None if earliest_valid is None else {
+            "termination_date": format_date(earliest_valid[0]),
+            "new_employment_end": format_date(earliest_valid[1])},
+        "termination_dates": [format_date(date) for date in sweep.termination_dates],
+        "termination_cases": sweep.termination_cases,
+        "valid": sweep.valid,
+        "new_employment_ends": [format_date(date) for date in sweep.new_employment_ends],
+    }
+
+
+# --- EXECUTOR --- #
+
+# Evaluations and sweeps run in a bounded pool of processes, not on the event loop,
+# so a slow case does not hold up the other connections
+# Each serving process has its own pool, started before it accepts connections (see run_worker)
+# The pool processes are forked as well and share the preloaded holiday tables copy-on-write
+EXECUTOR_WORKERS = 2
+executor = None
+
+# Listening sockets of this process, see serve
+listening_sockets = []
+
+# Function to initialize a pool process: drop the signal handling inherited from the event loop of the serving process
+# and close the inherited listening sockets (otherwise they stay open after the serving process stopped accepting connections)
+# SIGTERM is ignored, running evaluations are finished and the pool is shut down by the serving process (see run_worker)
+# If the serving process dies (e.g. killed), the pool process exits as well
+def init_pool_process(serving_process):
+    for sock in listening_sockets:
+        sock.close()
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    threading.Thread(target=watch_serving_process, args=(serving_process,), daemon=True).start()
+
+# Function to exit once the serving process is gone (the pool process is then adopted by another process)
+def watch_serving_process(serving_process):
+    while os.getppid() == serving_process:
+        time.sleep(1)
+    os._exit(1)
+
+# Function to run a function in the executor, returns an awaitable of its return value
+# Function and arguments must be picklable (module level functions, dataclasses, dicts and lists)
+async def run_in_executor(function, *args):
+    global executor
+    if executor is None:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            EXECUTOR_WORKERS, mp_context=multiprocessing.get_context("fork"),
+            initializer=init_pool_process, initargs=(os.getpid(),))
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+    except concurrent.futures.process.BrokenProcessPool:
+        # A pool process died (e.g. killed), start a new pool for the next calls
+        executor = None
+        raise
+
+
+# --- HANDLERS --- #
+
+# Base handler for JSON requests and responses
+class JSONHandler(tornado.web.RequestHandler):
+
+    def load_json(self):
+        try:
+            return json.loads(self.request.body)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="Invalid JSON")
+
+    def write_json(self, data, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps(data))
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({"error": self._reason}, status_code)
+
+# POST /evaluate: evaluate one case
+class EvaluateHandler(JSONHandler):
+
+    async def post(self):
+        result = await evaluate_case(self.load_json())
+        self.write_json(result, 400 if "error" in result else 200)
+
+# POST /evaluate/batch: evaluate a list of cases ({"cases": [...]}), errors are reported per case
+class EvaluateBatchHandler(JSONHandler):
+
+    async def post(self):
+        data = self.load_json()
+        if not (isinstance(data, dict) and isinstance(data.get("cases"), list)):
+            raise tornado.web.HTTPError(400, reason="Expected a JSON object with a list of cases")
+        if len(data["cases"]) > MAX_BATCH_SIZE:
+            raise tornado.web.HTTPError(413, reason="At most " + str(MAX_BATCH_SIZE) + " cases per request")
+        self.write_json({"results": await asyncio.gather(*(evaluate_case(case) for case in data["cases"]))})
+
+# POST /sweep: evaluate every termination date from "start" to "end" for a case ({"case": {...}, "start": ..., "end": ...})
+class SweepHandler(JSONHandler):
+
+    async def post(self):
+        data = self.load_json()
+        if not isinstance(data, dict):
+            raise tornado.web.HTTPError(400, reason="Expected a JSON object with a case, a start and an end date")
+        try:
+            case = parse_case(data.get("case"))
+            start = batch.parse_date(data["start"])
+            end = batch.parse_date(data["end"])
+        except Exception as error:
+            raise tornado.web.HTTPError(400, reason=type(error).__name__ + ": " + str(error))
+        if not (0 <= (end - start).days < MAX_SWEEP_DAYS):
+            raise tornado.web.HTTPError(400, reason="The sweep must end after its start and cover at most " + str(MAX_SWEEP_DAYS) + " days")
+        if start < case.employment_start:
+            raise tornado.web.HTTPError(400, reason="The sweep cannot start before the employment start date")
+        sweep_start = time.perf_counter()
+        sweep = await run_in_executor(engine.sweep_termination_dates, case, start, end)
+        metrics.observe_stage("sweep", time.perf_counter() - sweep_start)
+        self.write_json(format_sweep(sweep))
+
+# GET /cache: hit/miss counters of the result caches
+class CacheStatsHandler(JSONHandler):
+
+    def get(self):
+        self.write_json(result_cache.stats())
+
+# GET /metrics: stage timings and case counters in the Prometheus text format (see metrics.py)
+class MetricsHandler(tornado.web.RequestHandler):
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.finish(metrics.render())
+
+
+# GET /assets/<name>-<version>.js: scripts of the web interface (see assets.py)
+# Served gzipped if the client accepts it, the URL changes with the content so it may be cached for a year
+class AssetHandler(tornado.web.RequestHandler):
+
+    gzipped = False
+
+    def compute_etag(self):
+        return '"' + self.version + ("-gzip" if self.gzipped else "") + '"'
+
+    def get(self, name, version):
+        if (name not in assets.ASSETS) or (version != assets.asset_version(name)):
+            raise tornado.web.HTTPError(404)
+        self.version = version
+        self.gzipped = "gzip" in self.request.headers.get("Accept-Encoding", "")
+        self.set_header("Content-Type", "application/javascript; charset=utf-8")
+        self.set_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.set_header("Vary", "Accept-Encoding")
+        if self.gzipped:
+            self.set_header("Content-Encoding", "gzip")
+            self.finish(assets.asset_gzipped(name))
+        else:
+            self.finish(assets.asset_content(name))
+
+
+# --- SERVER --- #
+
+# Seconds a worker waits for open web interface sessions to end after SIGTERM
+GRACE_PERIOD = 30
+
+# Number of open web interface sessions (websocket connections) of this process
+open_sessions = 0
+
+# Function to create the PyWebIO handler, counting the open sessions
+# The PyWebIO scripts and styles are served by the app itself (no CDN)
+def session_handler(app):
+
+    class SessionHandler(webio_handler(app, cdn=False)):
+
+        def open(self):
+            global open_sessions
+            open_sessions += 1
+            super().open()
+
+        def on_close(self):
+            global open_sessions
+            open_sessions -= 1
+            super().on_close()
+
+    return SessionHandler
+
+# Function to create the tornado application serving the JSON API and the PyWebIO app
+# Without PyWebIO app (app=None) only the JSON API is served (headless)
+def make_app(app=None, debug=False):
+    handlers = [
+        (r"/evaluate", EvaluateHandler),
+        (r"/evaluate/batch", EvaluateBatchHandler),
+        (r"/sweep", SweepHandler),
+        (r"/cache", CacheStatsHandler),
+        (r"/metrics", MetricsHandler),
+    ]
+    if app is not None:
+        handlers += [
+            (r"/", session_handler(app)),
+            (r"/assets/([a-z]+)-([0-9a-f]+)\.js", AssetHandler),
+            (r"/(.*)", tornado.web.StaticFileHandler, {"path": STATIC_PATH, "default_filename": "index.html"}),
+        ]
+    return tornado.web.Application(handlers, websocket_ping_interval=30, debug=debug)
+
+# Function to load shared state before forking, the workers and their pool processes share it copy-on-write
+# The holiday file is mapped on import (see holiday_calendar.py), its tables are decoded here once for all workers,
+# as are the scripts of the web interface (if served)
+def preload(app=None):
+    if app is not None:
+        assets.preload()
+    for canton in holiday_calendar.CANTONS:
+        for year in range(holiday_calendar.FIRST_YEAR, holiday_calendar.LAST_YEAR + 1):
+            holiday_calendar.holiday_table(canton, year)
+    # Keep the garbage collector from touching (and thereby copying) the preloaded objects
+    gc.freeze()
+
+# Function to run a worker until SIGTERM, then shut it down gracefully:
+# stop accepting connections, let open sessions end (max GRACE_PERIOD seconds), close the remaining connections and the executor
+async def run_worker(app, debug, sockets):
+    # Fork the pool processes while no connections are open, they only inherit the listening sockets
+    await run_in_executor(int)
+    http_server = tornado.httpserver.HTTPServer(make_app(app, debug), max_buffer_size=MAX_BODY_SIZE)
+    http_server.add_sockets(sockets)
+    stopping = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    await stopping.wait()
+    http_server.stop()
+    deadline = time.monotonic() + GRACE_PERIOD
+    while (open_sessions > 0) and (time.monotonic() < deadline):
+        await asyncio.sleep(0.5)
+    await http_server.close_all_connections()
+    if executor is not None:
+        executor.shutdown()
+
+# Function to fork the worker processes, returns the number of the worker (0 to workers - 1) in each worker
+# The parent only supervises the workers: crashed workers are restarted (as by tornado.process.fork_processes),
+# for this the parent keeps its copies of the listening sockets until SIGTERM
+# On SIGTERM the parent closes its copies, forwards SIGTERM to the workers and exits once all of them have stopped
+# (a listening socket only leaves the SO_REUSEPORT group once all its copies are closed)
+def fork_workers(workers, sockets):
+    children = {}
+    pending = list(range(workers))
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for sock in sockets:
+            sock.close()
+        for pid in list(children):
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    while True:
+        while pending and not stopping:
+            worker = pending.pop(0)
+            # No SIGTERM before the worker has reset the handler of the parent
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+            pid = os.fork()
+            if pid == 0:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+                return worker
+            children[pid] = worker
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+        if not children:
+            sys.exit(0)
+        pid, status = os.wait()
+        if pid not in children:
+            continue
+        worker = children.pop(pid)
+        if (status != 0) and not stopping:
+            tornado.log.gen_log.warning("worker %d (pid %d) stopped with status %d, restarting", worker, pid, status)
+            pending.append(worker)
+
+# Function to start the server (blocking)
+# workers > 1 (0: one per CPU) forks worker processes after binding the port, the connections are distributed among them
+# Crashed workers are restarted, SIGTERM to the server (or its process group) shuts all workers down gracefully
+# The port is bound with SO_REUSEPORT where available: for a restart without downtime, start the new server first,
+# then send SIGTERM to the old one
+def serve(app=None, port=41780, host="", debug=False, workers=1):
+    sockets = tornado.netutil.bind_sockets(port, address=host or None, reuse_port=hasattr(socket, "SO_REUSEPORT"))
+    listening_sockets.extend(sockets)
+    preload(app)
+    if workers != 1:
+        workers = workers if workers > 0 else tornado.process.cpu_count()
+        # Shared by all workers, each worker records into its own block (restarted workers continue their block)
+        metrics.setup(workers)
+        metrics.select_worker(fork_workers(workers, sockets))
+    asyncio.run(run_worker(app, debug, sockets))
+
+
+# --- DEPLOYMENT --- #
+
+# Headless JSON API server, use work_calc.py for the web interface
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the JSON API without the web interface.")
+    parser.add_argument("--port", type=int, default=41780)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes (0: one per CPU)")
+    args = parser.parse_args()
+    serve(port=args.port, host=args.host, workers=args.workers)
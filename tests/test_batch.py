@@ -0,0 +1,84 @@
+import datetime
+import pytest
+import batch
+
+
+# --- PARSING --- #
+
+@pytest.mark.parametrize("value, date", [
+    ("2021-06-30", datetime.date(2021, 6, 30)),
+    (" 30.06.2021 ", datetime.date(2021, 6, 30)),
+    ("1.2.2021", datetime.date(2021, 2, 1)),
+    (datetime.date(2021, 6, 30), datetime.date(2021, 6, 30)),
+    (datetime.datetime(2021, 6, 30, 12), datetime.date(2021, 6, 30)),
+])
+def test_parse_date(value, date):
+    assert batch.parse_date(value) == date
+
+@pytest.mark.parametrize("value, message", [
+    ("31.02.2020", "Invalid date 31.02.2020: day is out of range"),
+    ("2021-02-30", "Invalid date 2021-02-30: day is out of range"),
+    ("30/06/2021", "A date must be given as YYYY-MM-DD or DD.MM.YYYY"),
+    (20210630, "A date must be given as YYYY-MM-DD or DD.MM.YYYY"),
+])
+def test_parse_date_invalid(value, message):
+    with pytest.raises(ValueError, match=message):
+        batch.parse_date(value)
+
+# Function to build an input row, all columns empty unless given
+def make_row(**cells):
+    row = dict.fromkeys(batch.INPUT_COLUMNS, "")
+    row.update(employment_start="2020-01-01", canton="ZH")
+    row.update(cells)
+    return row
+
+def test_parse_case():
+    case = batch.parse_case(make_row(
+        incapacity_type="illacc", incapacities="2021-01-10/2021-01-20;01.02.2021/2021-02-05|2021-03-01/2021-03-02",
+        trial_months="3", workdays="0,1,2", termination_date="2021-06-30", notice_months="2", endpoint="week",
+        trial_notice_days="14"))
+    assert case.employment_start == datetime.date(2020, 1, 1)
+    assert case.incapacities == [
+        [(datetime.date(2021, 1, 10), datetime.date(2021, 1, 20)), (datetime.date(2021, 2, 1), datetime.date(2021, 2, 5))],
+        [(datetime.date(2021, 3, 1), datetime.date(2021, 3, 2))]]
+    assert (case.trial_months, case.workdays, case.notice_months, case.endpoint, case.trial_notice_days) == (3, (0, 1, 2), 2, "week", 14)
+
+def test_parse_case_defaults():
+    case = batch.parse_case(make_row())
+    assert (case.incapacity_type, case.incapacities, case.trial_months, case.termination_date) == (None, [], None, None)
+    assert (case.workdays, case.endpoint, case.trial_notice_days) == ((0, 1, 2, 3, 4), "month", 7)
+
+@pytest.mark.parametrize("cells, message", [
+    ({"canton": "XX"}, "Unknown canton"),
+    ({"incapacity_type": "holiday"}, "Unknown incapacity type"),
+    ({"endpoint": "day"}, "Unknown endpoint"),
+    ({"incapacities": "2021-03-15/2021-01-10"}, "ends before it starts"),
+    ({"incapacities": "2021-01-10/2021-03-15;2021-03-01/2021-04-01"}, "chronological order"),
+    ({"incapacities": "2021-03-15"}, "start/end"),
+    ({"termination_date": "2019-06-30"}, "termination date cannot be before"),
+    ({"trial_months": "-5"}, "trial_months"),
+    ({"notice_months": "-3"}, "notice_months"),
+    ({"trial_notice_days": "31"}, "trial_notice_days"),
+    ({"workdays": "9"}, "Workdays"),
+    ({"workdays": "1,1"}, "Workdays"),
+])
+def test_parse_case_invalid(cells, message):
+    with pytest.raises(ValueError, match=message):
+        batch.parse_case(make_row(**cells))
+
+def test_parse_case_extra_cells():
+    row = make_row()
+    row[None] = ["x"]
+    with pytest.raises(ValueError, match="more cells than the header"):
+        batch.parse_case(row)
+
+
+# --- EVALUATION --- #
+
+# Invalid rows are reported in the error column, the other rows of the chunk are evaluated
+def test_evaluate_chunk_errors():
+    results = batch.evaluate_chunk([make_row(canton="XX"), make_row(termination_date="2021-06-30")])
+    assert results[0]["error"] == "ValueError: Unknown canton: XX"
+    assert results[0]["termination_case"] is None
+    assert results[1]["error"] is None
+    assert results[1]["termination_case"] == "standard_case"
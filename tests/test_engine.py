@@ -0,0 +1,141 @@
+import dataclasses
+import datetime
+import pytest
+import engine
+
+
+# Case with an illness, a probation period and a termination
+CASE = engine.Case(
+    employment_start=datetime.date(2018, 3, 1),
+    canton="ZH",
+    incapacity_type="illacc",
+    incapacities=[[(datetime.date(2021, 1, 10), datetime.date(2021, 3, 15))]],
+    trial_months=3,
+    termination_date=datetime.date(2021, 2, 1))
+
+
+# --- EVALUATION --- #
+
+D = datetime.date
+
+# Known cases (checked against the calculation before the extraction into engine.py) and their expected results
+KNOWN_CASES = [
+    # Regular termination in the third service year: two months notice to the end of a month
+    (engine.Case(employment_start=D(2018, 3, 1), canton="ZH", termination_date=D(2021, 2, 1)),
+     dict(termination_case="standard_case", valid=True, new_employment_end=D(2021, 4, 30),
+          notice_period=[D(2021, 3, 1), D(2021, 4, 30)], notice_compensation=[], notice_extension=[], notice_overlap=0)),
+    # Termination during the embargo period of an illness: invalid
+    (engine.Case(employment_start=D(2018, 3, 1), canton="ZH", incapacity_type="illacc",
+                 incapacities=[[(D(2021, 1, 10), D(2021, 3, 15))]], termination_date=D(2021, 2, 1)),
+     dict(termination_case="embargo_case", valid=False, new_employment_end=None, notice_period=[],
+          embargo_periods=[[D(2021, 1, 10), D(2021, 3, 15)]],
+          sick_pay_periods=[[D(2021, 1, 10), D(2021, 2, 28)], [D(2021, 3, 1), D(2021, 3, 15)]])),
+    # Illness during the notice period: the notice period is suspended, compensated and extended to the end of the month
+    (engine.Case(employment_start=D(2018, 3, 1), canton="ZH", incapacity_type="illacc",
+                 incapacities=[[(D(2021, 2, 10), D(2021, 2, 20))]], termination_date=D(2021, 1, 4)),
+     dict(termination_case="standard_case", valid=True, new_employment_end=D(2021, 4, 30),
+          notice_period=[D(2021, 2, 1), D(2021, 3, 31)], notice_compensation=[D(2021, 4, 1), D(2021, 4, 11)],
+          notice_extension=[D(2021, 4, 12), D(2021, 4, 30)], notice_overlap=11)),
+    # Termination during the probation period: seven days notice
+    (engine.Case(employment_start=D(2021, 3, 1), canton="ZH", trial_months=3, termination_date=D(2021, 4, 15)),
+     dict(termination_case="trial_case", valid=True, new_employment_end=D(2021, 4, 22),
+          trial_period=[D(2021, 3, 1), D(2021, 4, 15)], notice_period=[D(2021, 4, 16), D(2021, 4, 22)])),
+    # Illness during the probation period: extended by the nine missed workdays
+    (engine.Case(employment_start=D(2021, 3, 1), canton="ZH", incapacity_type="illacc",
+                 incapacities=[[(D(2021, 4, 6), D(2021, 4, 16))]], trial_months=3),
+     dict(termination_case="no_case", valid=None, trial_period=[D(2021, 3, 1), D(2021, 6, 11)], trial_extension_days=9,
+          embargo_periods=[])),
+    # Pregnancy: embargo until 16 weeks after the birth
+    (engine.Case(employment_start=D(2015, 1, 1), canton="BE", incapacity_type="preg",
+                 incapacities=[[(D(2020, 5, 1), D(2021, 1, 15))]], termination_date=D(2020, 12, 1), notice_months=3),
+     dict(termination_case="embargo_case", valid=False, embargo_periods=[[D(2020, 5, 1), D(2021, 5, 6)]],
+          sick_pay_periods=[[D(2021, 1, 15), D(2021, 4, 23)]])),
+    # Military service of more than 11 days: embargo from four weeks before to four weeks after
+    (engine.Case(employment_start=D(2015, 1, 1), canton="BE", incapacity_type="milservice",
+                 incapacities=[[(D(2020, 6, 1), D(2020, 6, 30))]], termination_date=D(2020, 7, 15)),
+     dict(termination_case="embargo_case", valid=False, embargo_periods=[[D(2020, 5, 3), D(2020, 7, 29)]])),
+]
+
+@pytest.mark.parametrize("case, expected", KNOWN_CASES)
+def test_evaluate_known_cases(case, expected):
+    result = engine.evaluate(case, today=D(2021, 6, 1))
+    assert {name: getattr(result, name) for name in expected} == expected
+
+# Without termination the seniority ends three years from today
+def test_evaluate_without_termination():
+    result = engine.evaluate(engine.Case(employment_start=D(2018, 3, 1), canton="ZH"), today=D(2021, 6, 1))
+    assert result.termination_case == "no_case"
+    assert result.regular_employment == [D(2018, 3, 1), D(2024, 6, 1)]
+
+# The day ordinals of a case, as used by the stages
+def test_case_ordinals():
+    employment_sdt, termination_dt, incap_dct = engine.case_ordinals(KNOWN_CASES[1][0])
+    assert employment_sdt == D(2018, 3, 1).toordinal()
+    assert termination_dt == D(2021, 2, 1).toordinal()
+    assert incap_dct == {1: [[D(2021, 1, 10).toordinal(), D(2021, 3, 15).toordinal()]]}
+
+# Precomputed stage outputs replace the stage
+def test_run_precomputed():
+    case = KNOWN_CASES[4][0]
+    employment_sdt, termination_dt, incap_dct = engine.case_ordinals(case, D(2021, 6, 1))
+    outputs = engine.trial_stage(employment_sdt, 3, case.workdays, case.canton, [], termination_dt)
+    result = engine.evaluate(case, D(2021, 6, 1), run=engine.run_precomputed({engine.trial_stage: outputs}))
+    assert result.trial_period == [D(2021, 3, 1), D(2021, 5, 31)]
+
+
+# --- WHAT-IF SWEEP --- #
+
+# Cases to sweep: an illness across the probation period and two later illnesses, a pregnancy and military service
+SWEEP_CASES = [
+    engine.Case(employment_start=D(2020, 11, 1), canton="ZH", incapacity_type="illacc",
+                incapacities=[[(D(2021, 1, 10), D(2021, 1, 20))], [(D(2021, 3, 1), D(2021, 4, 15)), (D(2021, 6, 1), D(2021, 6, 30))]],
+                trial_months=3),
+    engine.Case(employment_start=D(2015, 1, 1), canton="BE", incapacity_type="preg",
+                incapacities=[[(D(2020, 5, 1), D(2021, 1, 15))]], notice_months=3, endpoint="anytime"),
+    engine.Case(employment_start=D(2019, 6, 1), canton="GE", incapacity_type="milservice",
+                incapacities=[[(D(2021, 6, 1), D(2021, 6, 30))]], endpoint="quarter", workdays=[0, 1, 2, 3]),
+]
+
+# The sweep gives the same results as evaluating each termination date on its own
+@pytest.mark.parametrize("case", SWEEP_CASES)
+def test_sweep_matches_evaluate(case):
+    start, end = D(2020, 11, 1), D(2021, 9, 30)
+    sweep = engine.sweep_termination_dates(case, start, end)
+    assert sweep.termination_dates == [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    for i, termination_date in enumerate(sweep.termination_dates):
+        result = engine.evaluate(dataclasses.replace(case, termination_date=termination_date))
+        assert sweep.termination_cases[i] == result.termination_case, termination_date
+        assert sweep.valid[i] == result.valid, termination_date
+        assert sweep.new_employment_ends[i] == result.new_employment_end, termination_date
+
+def test_sweep_earliest_valid():
+    sweep = engine.sweep_termination_dates(SWEEP_CASES[1], D(2020, 12, 1), D(2021, 6, 30))
+    assert sweep.earliest_valid() == (D(2021, 5, 7), D(2021, 8, 7))
+    assert engine.sweep_termination_dates(SWEEP_CASES[1], D(2020, 12, 1), D(2021, 1, 31)).earliest_valid() is None
+
+
+# --- INCREMENTAL EVALUATION --- #
+
+# A new termination date only reruns the stages depending on it (probation period, notice period and sick pay cap),
+# the result equals a complete evaluation
+def test_incremental_evaluator_termination_date():
+    evaluator = engine.IncrementalEvaluator()
+    assert evaluator.evaluate(CASE) == engine.evaluate(CASE)
+    assert (evaluator.runs, evaluator.reuses) == (7, 0)
+    for termination_date in (datetime.date(2021, 4, 1), datetime.date(2021, 6, 30)):
+        case = dataclasses.replace(CASE, termination_date=termination_date)
+        assert evaluator.evaluate(case) == engine.evaluate(case)
+    assert (evaluator.runs, evaluator.reuses) == (13, 8)
+    assert [stage for stage, (inputs, outputs) in evaluator.outputs.items()] == [
+        "seniority_stage", "incapacity_stage", "trial_stage", "embargo_stage", "notice_stage", "sick_pay_split_stage", "sick_pay_stage"]
+
+# The stages that cannot be reused run with the given runner
+def test_incremental_evaluator_runner():
+    evaluator = engine.IncrementalEvaluator()
+    evaluator.evaluate(CASE)
+    stages = []
+    def run(stage, *args):
+        stages.append(stage.__name__)
+        return stage(*args)
+    evaluator.evaluate(dataclasses.replace(CASE, termination_date=datetime.date(2021, 4, 1)), run=run)
+    assert stages == ["trial_stage", "notice_stage", "sick_pay_stage"]
@@ -0,0 +1,58 @@
+import datetime
+import pytest
+import holiday_calendar
+from holiday_calendar import CANTONS, FIRST_YEAR, LAST_YEAR
+
+
+# Holiday file built into a temporary directory, mapped in place of the deployed file
+@pytest.fixture(scope="module")
+def holiday_file(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("holidays") / "holidays.bin")
+    holiday_calendar.build_holiday_file(path)
+    return path
+
+@pytest.fixture
+def precomputed(holiday_file, monkeypatch):
+    data = holiday_calendar.load_holiday_file(holiday_file)
+    assert data is not None
+    monkeypatch.setattr(holiday_calendar, "precomputed", data)
+    holiday_calendar.holiday_table.cache_clear()
+    yield data
+    holiday_calendar.holiday_table.cache_clear()
+
+
+# --- PRECOMPUTED HOLIDAYS --- #
+
+def test_holiday_file_matches_rules(precomputed):
+    for canton in CANTONS:
+        for year in range(FIRST_YEAR, LAST_YEAR + 1):
+            assert holiday_calendar.read_holidays(canton, year) == holiday_calendar.compute_holidays(canton, year), (canton, year)
+
+def test_is_holiday_matches_rules(precomputed):
+    day = datetime.date(2020, 1, 1)
+    while day.year < 2022:
+        for canton in CANTONS:
+            assert holiday_calendar.is_holiday(day, canton) == (day.toordinal() in holiday_calendar.compute_holidays(canton, day.year))
+        day += datetime.timedelta(days=1)
+
+# Years outside the file are computed from the rules
+def test_holiday_table_outside_file(precomputed):
+    assert not holiday_calendar.is_precomputed("ZH", LAST_YEAR + 1)
+    assert holiday_calendar.holiday_table("ZH", LAST_YEAR + 1) == holiday_calendar.compute_holidays("ZH", LAST_YEAR + 1)
+
+def test_missing_file(tmp_path):
+    assert holiday_calendar.load_holiday_file(str(tmp_path / "missing.bin")) is None
+    (tmp_path / "empty.bin").write_bytes(b"")
+    assert holiday_calendar.load_holiday_file(str(tmp_path / "empty.bin")) is None
+
+def test_truncated_file(holiday_file, tmp_path):
+    with open(holiday_file, "rb") as file:
+        data = file.read()
+    (tmp_path / "truncated.bin").write_bytes(data[:-1])
+    assert holiday_calendar.load_holiday_file(str(tmp_path / "truncated.bin")) is None
+
+def test_wrong_magic(holiday_file, tmp_path):
+    with open(holiday_file, "rb") as file:
+        data = file.read()
+    (tmp_path / "magic.bin").write_bytes(b"XXXXXX" + data[6:])
+    assert holiday_calendar.load_holiday_file(str(tmp_path / "magic.bin")) is None
@@ -0,0 +1,60 @@
+import random
+import pytest
+from intervals import IntervalSet
+
+
+# Function to suspend a period day by day: every day within the intervals is made up after the period,
+# skipping days within the intervals
+def suspend_by_day(intervals, start, end):
+    days = {day for interval_start, interval_end in intervals for day in range(interval_start, interval_end + 1)}
+    overlap = sum(1 for day in range(start, end + 1) if day in days)
+    if overlap == 0:
+        return 0, []
+    compensation_end = end
+    remaining = overlap
+    while remaining > 0:
+        compensation_end += 1
+        if compensation_end not in days:
+            remaining -= 1
+    return overlap, [end + 1, compensation_end]
+
+
+# --- INTERVAL SET --- #
+
+def test_intervals_are_merged_and_sorted():
+    interval_set = IntervalSet([[20, 25], [1, 5], [4, 8], [9, 10], [12, 11]])
+    assert interval_set.periods() == [[1, 8], [9, 10], [20, 25]]
+    assert len(interval_set) == 3
+    assert interval_set == IntervalSet([[1, 8], [9, 10], [20, 25]])
+
+def test_contains():
+    interval_set = IntervalSet([[1, 8], [20, 25]])
+    assert [day for day in range(0, 30) if interval_set.contains(day)] == list(range(1, 9)) + list(range(20, 26))
+
+
+# --- SUSPENSION --- #
+
+@pytest.mark.parametrize("intervals, period, expected", [
+    # No overlap
+    ([[1, 5]], [10, 20], (0, [])),
+    # Interval within the period
+    ([[12, 13]], [10, 20], (2, [21, 22])),
+    # Interval reaching beyond the period: the compensation starts after it
+    ([[18, 25]], [10, 20], (3, [21, 28])),
+    # Compensation interrupted by a later interval
+    ([[12, 13], [22, 22]], [10, 20], (2, [21, 23])),
+])
+def test_suspend(intervals, period, expected):
+    assert IntervalSet(intervals).suspend(*period) == expected
+
+# Random intervals and periods against day by day suspension
+def test_suspend_matches_day_by_day():
+    rng = random.Random(0)
+    for _ in range(2000):
+        intervals = []
+        for _ in range(rng.randint(0, 6)):
+            interval_start = rng.randint(0, 100)
+            intervals.append([interval_start, interval_start + rng.randint(0, 15)])
+        start = rng.randint(0, 80)
+        end = start + rng.randint(0, 40)
+        assert IntervalSet(intervals).suspend(start, end) == suspend_by_day(intervals, start, end), (intervals, start, end)
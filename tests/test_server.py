@@ -0,0 +1,168 @@
+import base64
+import datetime
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import pytest
+import tornado.testing
+import server
+
+
+# --- PARSING --- #
+
+# Function to build a JSON case, employment start and canton unless given
+def make_case(**fields):
+    return {"employment_start": "2018-03-01", "canton": "ZH", **fields}
+
+def test_parse_case():
+    case = server.parse_case(make_case(
+        incapacity_type="illacc", incapacities=[[["2021-01-10", "2021-01-20"], ["01.02.2021", "2021-02-05"]]],
+        trial_months=3, workdays=[0, 1, 2], termination_date="2021-06-30", notice_months=2, endpoint="week",
+        trial_notice_days=14))
+    assert case.incapacities == [[(datetime.date(2021, 1, 10), datetime.date(2021, 1, 20)), (datetime.date(2021, 2, 1), datetime.date(2021, 2, 5))]]
+    assert (case.trial_months, case.workdays, case.notice_months, case.endpoint, case.trial_notice_days) == (3, (0, 1, 2), 2, "week", 14)
+
+@pytest.mark.parametrize("fields, message", [
+    ({"canton": "XX"}, "Unknown canton"),
+    ({"incapacity_type": "holiday"}, "Unknown incapacity type"),
+    ({"endpoint": "day"}, "Unknown endpoint"),
+    ({"incapacities": [[["2021-03-15", "2021-01-10"]]]}, "ends before it starts"),
+    ({"incapacities": [[["2021-01-10", "2021-03-15"], ["2021-03-01", "2021-04-01"]]]}, "chronological order"),
+    ({"incapacities": [[["2021-03-15"]]]}, "list of a start and an end date"),
+    ({"incapacities": [["2021-03-15", "2021-04-01"]]}, "list of a start and an end date"),
+    ({"incapacities": "2021-03-15/2021-04-01"}, "list of incapacities"),
+    ({"termination_date": "2017-06-30"}, "termination date cannot be before"),
+    ({"termination_date": 20210630}, "A date must be given"),
+    ({"termination_date": "30/06/2021"}, "A date must be given"),
+    ({"trial_months": -5}, "trial_months"),
+    ({"notice_months": -3}, "notice_months"),
+    ({"trial_notice_days": 31}, "trial_notice_days"),
+    ({"workdays": [9]}, "Workdays"),
+    ({"workdays": []}, "Workdays"),
+    ({"workdays": 5}, "Workdays"),
+])
+def test_parse_case_invalid(fields, message):
+    with pytest.raises(ValueError, match=message):
+        server.parse_case(make_case(**fields))
+
+def test_parse_case_missing_field():
+    with pytest.raises(ValueError, match="Missing field: canton"):
+        server.parse_case({"employment_start": "2018-03-01"})
+
+
+# --- HANDLERS --- #
+
+class TestHandlers(tornado.testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return server.make_app()
+
+    def post_json(self, path, data):
+        response = self.fetch(path, method="POST", body=json.dumps(data))
+        return response.code, json.loads(response.body)
+
+    def test_evaluate_invalid(self):
+        code, body = self.post_json("/evaluate", make_case(
+            incapacity_type="illacc", incapacities=[[["2021-03-15", "2021-01-10"]]], termination_date="2021-02-01"))
+        assert code == 400
+        assert "ends before it starts" in body["error"]
+
+    def test_sweep_invalid(self):
+        code, body = self.post_json("/sweep", {"case": make_case(), "start": 5, "end": "2021-01-01"})
+        assert code == 400
+        assert "A date must be given" in body["error"]
+        code, body = self.post_json("/sweep", {"case": make_case(), "start": "2017-01-01", "end": "2018-06-01"})
+        assert code == 400
+        assert "before the employment start" in body["error"]
+
+
+# --- RESTART --- #
+
+# Server with a web interface app that waits for input (so open sessions keep the server running after SIGTERM)
+WEB_SERVER = """
+import sys
+from pywebio.input import input
+import server
+server.GRACE_PERIOD = 20
+server.serve(lambda: input("x"), port=int(sys.argv[1]), host="127.0.0.1", workers=2)
+"""
+
+# Headless server (answers GET / with 404, the web server with 200)
+HEADLESS_SERVER = """
+import sys
+import server
+server.serve(port=int(sys.argv[1]), host="127.0.0.1", workers=2)
+"""
+
+# Function to find a free port
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# Function to start a server in its own process group
+def start_server(script, port):
+    return subprocess.Popen([sys.executable, "-c", script, str(port)], start_new_session=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Function to request GET / and return the status
+def get_status(port, timeout=2):
+    try:
+        with urllib.request.urlopen("http://127.0.0.1:" + str(port) + "/", timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+# Function to wait until a request is answered with the given status
+def wait_for_status(port, status, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if get_status(port, timeout=1) == status:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise AssertionError("No response with status " + str(status))
+
+# Function to open a web interface session (websocket), returns the connection
+def open_session(port):
+    connection = socket.create_connection(("127.0.0.1", port))
+    key = base64.b64encode(os.urandom(16)).decode()
+    connection.sendall(("GET /?app=index HTTP/1.1\r\nHost: 127.0.0.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                        "Sec-WebSocket-Key: " + key + "\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    assert connection.recv(1024).startswith(b"HTTP/1.1 101")
+    return connection
+
+@pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"), reason="requires SO_REUSEPORT")
+def test_restart_without_downtime():
+    port = free_port()
+    old_server = start_server(WEB_SERVER, port)
+    new_server = None
+    try:
+        wait_for_status(port, 200)
+        # Evaluate once, so the old server runs its pool processes
+        request = urllib.request.Request("http://127.0.0.1:" + str(port) + "/evaluate", method="POST",
+                                         data=b'{"employment_start": "2020-01-01", "canton": "ZH"}')
+        urllib.request.urlopen(request, timeout=10).close()
+        session = open_session(port)
+        new_server = start_server(HEADLESS_SERVER, port)
+        wait_for_status(port, 404)
+        os.killpg(old_server.pid, signal.SIGTERM)
+        time.sleep(1)
+        # The old server still runs (open session), but all connections go to the new server
+        assert old_server.poll() is None
+        assert [get_status(port) for _ in range(200)] == [404] * 200
+        session.close()
+        assert old_server.wait(timeout=30) == 0
+    finally:
+        for process in (old_server, new_server):
+            if (process is not None) and (process.poll() is None):
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
@@ -0,0 +1,29 @@
+import datetime
+import engine
+import work_calc
+
+
+# --- LABELS --- #
+
+# Both labels of a termination date option lead to the same endpoint
+def test_endpoint_labels():
+    for english, german, endpoint in work_calc.ENDPOINT_OPTIONS:
+        assert endpoint in engine.ENDPOINTS
+        assert work_calc.ENDPOINT_LABELS[english] == endpoint
+        assert work_calc.ENDPOINT_LABELS[german] == endpoint
+
+# Termination date "anytime": the notice period is compensated without extension to an endpoint, in both languages
+def test_endpoint_anytime():
+    results = []
+    for label in ("Termination date anytime", "Kündungstermin jederzeit"):
+        results.append(engine.evaluate(engine.Case(
+            employment_start=datetime.date(2018, 3, 1),
+            canton="ZH",
+            incapacity_type="illacc",
+            incapacities=[[(datetime.date(2021, 3, 10), datetime.date(2021, 3, 20))]],
+            termination_date=datetime.date(2021, 2, 15),
+            endpoint=work_calc.ENDPOINT_LABELS[label])))
+    assert results[0] == results[1]
+    assert results[0].notice_overlap == 11
+    assert results[0].notice_extension == []
+    assert results[0].new_employment_end == datetime.date(2021, 4, 26)
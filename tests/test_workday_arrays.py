@@ -0,0 +1,65 @@
+import datetime
+import random
+import engine
+import holiday_calendar
+import workday_arrays
+import workdays
+
+
+# Function to generate the engine.trial_stage arguments of a random case with incapacities around the probation period
+def random_trial_input(rng, workdays_num, years=(2000, 2030)):
+    employment_sdt = datetime.date(rng.randint(*years), rng.randint(1, 12), rng.randint(1, 28)).toordinal()
+    incap_dct = {}
+    for key in range(1, rng.randint(1, 3) + 1):
+        periods = []
+        start = employment_sdt + rng.randint(-30, 60)
+        for _ in range(rng.randint(1, 3)):
+            end = start + rng.randint(0, 40)
+            periods.append([start, end])
+            start = end + rng.randint(2, 40)
+        incap_dct[key] = periods
+    termination_dt = employment_sdt + rng.choice([rng.randint(10, 200), 3 * 365])
+    return (employment_sdt, rng.choice([1, 2, 3, 3, None]), workdays_num, rng.choice(holiday_calendar.CANTONS),
+            engine.incapacity_stage(incap_dct), termination_dt)
+
+
+# --- HOLIDAY AND WORKDAY MASKS --- #
+
+def test_workday_mask():
+    dates = [datetime.date(2021, 8, 1) + datetime.timedelta(days=i) for i in range(14)]
+    for canton in holiday_calendar.CANTONS:
+        expected = [(day.weekday() < 5) and not holiday_calendar.is_holiday(day, canton) for day in dates]
+        assert workday_arrays.workday_mask(dates, canton).tolist() == expected
+
+def test_count_workdays_matches_workdays():
+    rng = random.Random(0)
+    starts, ends, cantons, expected = [], [], [], []
+    for _ in range(500):
+        start = datetime.date(rng.randint(1940, 2110), 1, 1).toordinal() + rng.randint(0, 364)
+        end = start + rng.randint(-5, 800)
+        canton = rng.choice(holiday_calendar.CANTONS)
+        starts.append(datetime.date.fromordinal(start))
+        ends.append(datetime.date.fromordinal(end))
+        cantons.append(canton)
+        expected.append(workdays.count_workdays(
+            start, end, workdays.weekday_mask([0, 1, 2, 3, 4]), holiday_calendar.holidays_between(canton, start, end)))
+    assert workday_arrays.count_workdays(starts, ends, cantons).tolist() == expected
+
+
+# --- PROBATION PERIODS --- #
+
+# One group counted as arrays (Monday to Friday), small groups and cases before the holiday array calculated case by case
+def test_trial_stages_matches_trial_stage():
+    rng = random.Random(0)
+    inputs = [random_trial_input(rng, [0, 1, 2, 3, 4]) for _ in range(300)]
+    inputs += [random_trial_input(rng, [0, 2, 4]) for _ in range(5)]
+    inputs += [random_trial_input(rng, [0, 1, 2, 3, 4], years=(1900, 1949)) for _ in range(5)]
+    rng.shuffle(inputs)
+    assert workday_arrays.trial_stages(inputs) == [engine.trial_stage(*trial_input) for trial_input in inputs]
+
+# Every group counted as arrays, with various workdays
+def test_trial_stages_as_arrays(monkeypatch):
+    monkeypatch.setattr(workday_arrays, "MIN_GROUP_SIZE", 1)
+    rng = random.Random(1)
+    inputs = [random_trial_input(rng, rng.choice([[0, 1, 2, 3, 4], [0, 2, 4], [5, 6], [0, 1, 2, 3, 4, 5, 6]])) for _ in range(400)]
+    assert workday_arrays.trial_stages(inputs) == [engine.trial_stage(*trial_input) for trial_input in inputs]
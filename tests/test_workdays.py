@@ -0,0 +1,45 @@
+import datetime
+import random
+from workdays import weekday_mask, count_workdays, nth_workday
+
+
+START = datetime.date(2021, 1, 1).toordinal()
+
+
+# Function to check day by day if a day ordinal is a workday
+def is_workday(day, workdays, holidays):
+    return (datetime.date.fromordinal(day).weekday() in workdays) and (day not in holidays)
+
+# Function to generate random workdays, sorted holidays and a start day ordinal
+def random_inputs(rng):
+    workdays = [day for day in range(7) if rng.random() < 0.7]
+    holidays = sorted(rng.sample(range(START, START + 400), rng.randint(0, 20)))
+    return workdays, holidays, START + rng.randint(0, 300)
+
+
+# --- FUNCTIONS --- #
+
+def test_weekday_mask():
+    assert weekday_mask([0, 1, 2, 3, 4]) == (True, True, True, True, True, False, False)
+
+def test_count_workdays_matches_day_by_day():
+    rng = random.Random(0)
+    for _ in range(2000):
+        workdays, holidays, start = random_inputs(rng)
+        end = start + rng.randint(-3, 100)
+        expected = sum(1 for day in range(start, end + 1) if is_workday(day, workdays, holidays))
+        assert count_workdays(start, end, weekday_mask(workdays), holidays) == expected, (workdays, holidays, start, end)
+
+def test_nth_workday_matches_day_by_day():
+    rng = random.Random(1)
+    for _ in range(2000):
+        workdays, holidays, start = random_inputs(rng)
+        n = rng.randint(1, 60)
+        if workdays:
+            day, found = start - 1, 0
+            while found < n:
+                day += 1
+                found += is_workday(day, workdays, holidays)
+        else:
+            day = None
+        assert nth_workday(start, n, weekday_mask(workdays), holidays) == day, (workdays, holidays, start, n)
@@ -0,0 +1,106 @@
+import datetime
+import json
+import uuid
+import assets
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# Timeline chart as plain plotly figure dict, without pandas and plotly.express
+# The traces correspond to plotly.express.timeline (one horizontal bar trace per task)
+
+
+# --- FUNCTIONS --- #
+
+# Function to calculate the length of a bar in milliseconds (unit of plotly date axes)
+# Returns None for missing dates (bar not shown)
+def bar_length(start, end):
+    if isinstance(start, datetime.date) and isinstance(end, datetime.date):
+        return (end - start).days * 86400000
+    return None
+
+# Function to create one bar trace per task from rows of (task, start, end, stack)
+# Tasks keep the order of their first row (legend order)
+def timeline_traces(rows, colors):
+    traces = {}
+    for task, start, end, stack in rows:
+        if task not in traces:
+            traces[task] = {
+                "type": "bar",
+                "orientation": "h",
+                "name": task,
+                "legendgroup": task,
+                "showlegend": True,
+                "marker": {"color": colors.get(task), "opacity": 1, "pattern": {"shape": ""}, "line": {"width": 1.0}},
+                "opacity": 0.95,
+                "textposition": "auto",
+                "hovertemplate": "<b>%{hovertext}</b><br><br>start=%{base}<br>end=%{x}<extra></extra>",
+                "base": [],
+                "x": [],
+                "y": [],
+                "hovertext": [],
+                "xaxis": "x",
+                "yaxis": "y",
+            }
+        trace = traces[task]
+        trace["base"].append(start if start != "" else None)
+        trace["x"].append(bar_length(start, end))
+        trace["y"].append(stack)
+        trace["hovertext"].append(task)
+    return list(traces.values())
+
+# Function to create a timeline figure dict
+def timeline_figure(rows, colors, layout):
+    import plotly.io
+    return {
+        "data": timeline_traces(rows, colors),
+        "layout": {"template": plotly.io.templates[plotly.io.templates.default].to_plotly_json(), **layout},
+    }
+
+# Function to convert values the json module cannot handle (dates) for plotly.js
+def json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError("Object of type " + type(value).__name__ + " is not JSON serializable")
+
+# Function to render a figure dict as HTML snippet
+# Only the figure JSON is sent, plotly.js is loaded via require from the bundle served with the app (see assets.py)
+def figure_html(figure, config):
+    div_id = str(uuid.uuid4())
+    layout = figure.get("layout", {})
+    figure_json = json.dumps({"figure": figure, "config": config}, default=json_default, separators=(",", ":")).replace("</", "<\\/")
+    return (
+        '<div id="' + div_id + '" class="plotly-graph-div" style="height:' + str(layout.get("height", 450)) + 'px; width:' + str(layout.get("width", 700)) + 'px;"></div>'
+        '<script type="text/javascript">'
+        'require(["' + assets.asset_url("plotly") + '"], function(Plotly) {'
+        'var chart = ' + figure_json + ';'
+        'Plotly.newPlot("' + div_id + '", chart.figure.data, chart.figure.layout, chart.config);'
+        '});'
+        '</script>')
+
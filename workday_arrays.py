@@ -0,0 +1,251 @@
+import datetime
+from functools import lru_cache
+import numpy as np
+import engine
+import holiday_calendar
+import workdays as workday_arithmetic
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# Vectorized holiday and workday classification for batch evaluation
+# Dates are given as arrays (anything numpy converts to datetime64[D], e.g. datetime.date objects or "YYYY-MM-DD"),
+# cantons as arrays of canton abbreviations of the same length (or a single canton for all dates)
+# The holidays from FIRST_YEAR to LAST_YEAR are held in one boolean array per canton (read from the precomputed holiday
+# file if available, see holiday_calendar.py), dates outside this range are looked up one by one
+# trial_stages calculates the probation periods of many cases at once (used by batch.py for each chunk of cases)
+
+
+# --- HOLIDAY ARRAY --- #
+
+FIRST_DAY = np.datetime64(str(holiday_calendar.FIRST_YEAR) + "-01-01", "D")
+LAST_DAY = np.datetime64(str(holiday_calendar.LAST_YEAR) + "-12-31", "D")
+CANTON_INDEX = {canton: index for index, canton in enumerate(holiday_calendar.CANTONS)}
+
+# Function to build the holiday array, one row per canton (in the order of CANTONS) and one column per day from FIRST_DAY
+@lru_cache(maxsize=None)
+def holiday_array():
+    years = holiday_calendar.LAST_YEAR - holiday_calendar.FIRST_YEAR + 1
+    if holiday_calendar.precomputed is not None:
+        # Unpack the bitsets of the holiday file, drop the bits after the end of each year
+        bits = np.frombuffer(holiday_calendar.precomputed, dtype=np.uint8, offset=holiday_calendar.HEADER.size)
+        bits = np.unpackbits(bits.reshape(len(holiday_calendar.CANTONS), years, holiday_calendar.BLOCK_SIZE), axis=2, bitorder="little")
+        year_lengths = np.array([366 if (year % 4 == 0 and year % 100 != 0) or year % 400 == 0 else 365
+                                 for year in range(holiday_calendar.FIRST_YEAR, holiday_calendar.LAST_YEAR + 1)])
+        in_year = np.arange(bits.shape[2]) < year_lengths[:, None]
+        return bits[:, in_year].astype(bool)
+    # Compute from the rules
+    holidays = np.zeros((len(holiday_calendar.CANTONS), (LAST_DAY - FIRST_DAY).astype(int) + 1), dtype=bool)
+    first_day = datetime.date(holiday_calendar.FIRST_YEAR, 1, 1).toordinal()
+    for canton, index in CANTON_INDEX.items():
+        for year in range(holiday_calendar.FIRST_YEAR, holiday_calendar.LAST_YEAR + 1):
+            holidays[index, [day - first_day for day in holiday_calendar.holiday_table(canton, year)]] = True
+    return holidays
+
+
+# --- FUNCTIONS --- #
+
+# Function to convert dates and cantons into arrays of the same length
+# Raises ValueError for unknown cantons
+def to_arrays(dates, cantons):
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    cantons = np.broadcast_to(np.asarray(cantons), dates.shape)
+    try:
+        canton_indices = np.array([CANTON_INDEX[canton] for canton in cantons.ravel()], dtype=np.intp).reshape(dates.shape)
+    except KeyError as error:
+        raise ValueError("unknown canton: " + str(error.args[0]))
+    return dates, cantons, canton_indices
+
+# Function to convert weekday numbers (0 = Monday) into a weekday mask array
+def weekday_mask(workdays):
+    return np.array(workday_arithmetic.weekday_mask(workdays), dtype=bool)
+
+# Function to get the weekday of dates (0 = Monday, 01.01.1970 is a Thursday)
+def weekdays(dates):
+    return (dates.astype(np.int64) + 3) % 7
+
+# Function to classify dates as holidays of the given cantons
+# Returns a boolean array of the shape of dates
+def holiday_mask(dates, cantons):
+    dates, cantons, canton_indices = to_arrays(dates, cantons)
+    in_range = (dates >= FIRST_DAY) & (dates <= LAST_DAY)
+    offsets = np.where(in_range, (dates - FIRST_DAY).astype(np.int64), 0)
+    mask = holiday_array()[canton_indices, offsets] & in_range
+    # Dates outside the holiday array
+    for index in zip(*np.nonzero(~in_range)):
+        mask[index] = holiday_calendar.is_holiday(dates[index].item(), cantons[index])
+    return mask
+
+# Function to classify dates as workdays (weekday in workdays, no holiday) of the given cantons
+# workdays: weekday numbers (0 = Monday) for all dates
+# Returns a boolean array of the shape of dates
+def workday_mask(dates, cantons, workdays=(0, 1, 2, 3, 4)):
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    return weekday_mask(workdays)[weekdays(dates)] & ~holiday_mask(dates, cantons)
+
+# Function to build the cumulative workday count per canton for a weekday mask
+# Column i holds the number of workdays before FIRST_DAY + i
+@lru_cache(maxsize=16)
+def cumulative_workdays(mask):
+    days = np.arange(FIRST_DAY, LAST_DAY + 1)
+    is_workday = np.array(mask, dtype=bool)[weekdays(days)] & ~holiday_array()
+    counts = np.zeros((is_workday.shape[0], is_workday.shape[1] + 1), dtype=np.int32)
+    np.cumsum(is_workday, axis=1, out=counts[:, 1:])
+    return counts
+
+# Function to count the workdays between start and end dates (both included) of the given cantons
+# Same as workdays.count_workdays with the holidays of the canton, as one array operation
+# Returns an integer array of the shape of the dates
+def count_workdays(starts, ends, cantons, workdays=(0, 1, 2, 3, 4)):
+    starts, cantons, canton_indices = to_arrays(starts, cantons)
+    ends = np.broadcast_to(np.asarray(ends, dtype="datetime64[D]"), starts.shape)
+    mask = workday_arithmetic.weekday_mask(workdays)
+    in_range = (starts >= FIRST_DAY) & (ends <= LAST_DAY) & (starts <= ends)
+    start_offsets = np.where(in_range, (starts - FIRST_DAY).astype(np.int64), 0)
+    end_offsets = np.where(in_range, (ends - FIRST_DAY).astype(np.int64) + 1, 0)
+    counts = cumulative_workdays(mask)
+    result = np.where(in_range, counts[canton_indices, end_offsets] - counts[canton_indices, start_offsets], 0)
+    # Periods outside the holiday array
+    for index in zip(*np.nonzero(~in_range & (starts <= ends))):
+        start = starts[index].item().toordinal()
+        end = ends[index].item().toordinal()
+        result[index] = workday_arithmetic.count_workdays(start, end, mask, holiday_calendar.holidays_between(cantons[index], start, end))
+    return result
+
+
+# --- PROBATION PERIODS --- #
+
+# Day ordinal of FIRST_DAY and LAST_DAY (day offsets below are relative to FIRST_DAY)
+FIRST_ORDINAL = datetime.date(holiday_calendar.FIRST_YEAR, 1, 1).toordinal()
+LAST_ORDINAL = datetime.date(holiday_calendar.LAST_YEAR, 12, 31).toordinal()
+
+# Minimum number of cases with the same workdays for trial_stages to count them as arrays
+# (smaller groups do not pay off building the cumulative counts of their weekday mask)
+MIN_GROUP_SIZE = 32
+
+# Function to build the cumulative weekday count (holidays included) for a weekday mask
+# Element i holds the number of weekdays in the mask before FIRST_DAY + i
+@lru_cache(maxsize=16)
+def cumulative_weekdays(mask):
+    days = np.arange(FIRST_DAY, LAST_DAY + 1)
+    counts = np.zeros(len(days) + 1, dtype=np.int64)
+    np.cumsum(np.array(mask, dtype=bool)[weekdays(days)], out=counts[1:])
+    return counts
+
+# Function to count the workdays between start and end offsets (arrays, both included) for a weekday mask
+# Holidays only count within the window offsets (both included), as engine.trial_stage only gathers the holidays
+# of two years from the employment start
+def count_window(mask, canton_indices, starts, ends, window_starts, window_ends):
+    weekday_counts = cumulative_weekdays(mask)
+    workday_counts = cumulative_workdays(mask)
+    valid = starts <= ends
+    starts = np.where(valid, starts, 0)
+    ends = np.where(valid, ends, 0)
+    # Holidays on a weekday of the mask within the window
+    holiday_starts = np.maximum(starts, window_starts)
+    holiday_ends = np.minimum(ends, window_ends)
+    in_window = valid & (holiday_starts <= holiday_ends)
+    holiday_starts = np.where(in_window, holiday_starts, 0)
+    holiday_ends = np.where(in_window, holiday_ends, 0)
+    holidays = ((weekday_counts[holiday_ends + 1] - weekday_counts[holiday_starts])
+                - (workday_counts[canton_indices, holiday_ends + 1] - workday_counts[canton_indices, holiday_starts]))
+    return np.where(valid, weekday_counts[ends + 1] - weekday_counts[starts] - np.where(in_window, holidays, 0), 0)
+
+# Function to find the nth workday on or after start offsets (arrays), see count_window
+# The nth workday must lie within 365 days from the start (binary search over the days)
+def nth_workday_window(mask, canton_indices, starts, n, window_starts, window_ends):
+    low = starts
+    high = starts + 364
+    while np.any(low < high):
+        middle = (low + high) // 2
+        enough = count_window(mask, canton_indices, starts, middle, window_starts, window_ends) >= n
+        high = np.where(enough, middle, high)
+        low = np.where(enough, low, middle + 1)
+    return low
+
+# Function to calculate the probation periods of many cases at once, same outputs as engine.trial_stage for each case
+# inputs: arguments of engine.trial_stage per case (employment_sdt, trial_months, workdays_num, workplace, incap_masterlst, termination_dt)
+# Cases with incapacities during the probation period are grouped by workdays and their missed and repeated workdays
+# are counted as array operations, one round per incapacity period (each round depends on the probation period end of the last)
+# Cases reaching beyond the holiday array and small groups are calculated by engine.trial_stage
+def trial_stages(inputs):
+    outputs = []
+    groups = {}
+    for index, (employment_sdt, trial_months, workdays_num, workplace, incap_masterlst, termination_dt) in enumerate(inputs):
+        # Probation period without extension
+        outputs.append(engine.trial_stage(employment_sdt, trial_months, workdays_num, workplace, [], termination_dt))
+        if trial_months is None:
+            continue
+        trial_edt = outputs[index][0][1]
+        if not any((incap_sublst[0] <= trial_edt) and (incap_sublst[1] >= employment_sdt) for incap_sublst in incap_masterlst):
+            continue
+        # Every round may extend the probation period by up to one year
+        last_day = max([trial_edt] + [incap_sublst[1] for incap_sublst in incap_masterlst]) + 366 * (len(incap_masterlst) + 1)
+        if (employment_sdt < FIRST_ORDINAL) or (last_day > LAST_ORDINAL) or (workplace not in CANTON_INDEX):
+            outputs[index] = engine.trial_stage(*inputs[index])
+            continue
+        groups.setdefault(workday_arithmetic.weekday_mask(workdays_num), []).append(index)
+
+    for mask, indices in groups.items():
+        if len(indices) < MIN_GROUP_SIZE:
+            for index in indices:
+                outputs[index] = engine.trial_stage(*inputs[index])
+            continue
+        cases = [inputs[index] for index in indices]
+        trial_sdt = np.array([case[0] for case in cases], dtype=np.int64) - FIRST_ORDINAL
+        trial_edt = np.array([outputs[index][0][1] for index in indices], dtype=np.int64) - FIRST_ORDINAL
+        termination_dt = np.array([case[5] for case in cases], dtype=np.int64) - FIRST_ORDINAL
+        canton_indices = np.array([CANTON_INDEX[case[3]] for case in cases], dtype=np.intp)
+        window_edt = trial_sdt + 729
+        missed_workdays = np.zeros(len(cases), dtype=np.int64)
+        repeated_workdays = np.zeros(len(cases), dtype=np.int64)
+
+        for round_index in range(max(len(case[4]) for case in cases)):
+            active = np.array([round_index < len(case[4]) for case in cases])
+            incap_sdt = np.array([case[4][round_index][0] if active[number] else case[0] for number, case in enumerate(cases)], dtype=np.int64) - FIRST_ORDINAL
+            incap_edt = np.array([case[4][round_index][1] if active[number] else case[0] for number, case in enumerate(cases)], dtype=np.int64) - FIRST_ORDINAL
+
+            # Count working days missed during probation period
+            missed_workdays += np.where(active, count_window(
+                mask, canton_indices, np.maximum(trial_sdt, incap_sdt), np.minimum(trial_edt, incap_edt), trial_sdt, window_edt), 0)
+
+            # Repeat missed working days during probation period extension (within one year after the incapacity)
+            extension_sdt = np.maximum(trial_edt, incap_edt) + 1
+            available = count_window(mask, canton_indices, extension_sdt, extension_sdt + 364, trial_sdt, window_edt)
+            extension_workdays = np.where(active, np.minimum(missed_workdays - repeated_workdays, available), 0)
+            extend = extension_workdays > 0
+            if np.any(extend):
+                repeated_workdays += np.where(extend, extension_workdays, 0)
+                nth = nth_workday_window(mask, canton_indices[extend], extension_sdt[extend], extension_workdays[extend],
+                                         trial_sdt[extend], window_edt[extend])
+                trial_edt[extend] = np.minimum(nth, termination_dt[extend]) # cap at termination
+
+        for number, index in enumerate(indices):
+            end = int(trial_edt[number]) + FIRST_ORDINAL
+            outputs[index] = ([inputs[index][0], end], int(missed_workdays[number]), end + 1)
+    return outputs
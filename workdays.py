@@ -0,0 +1,76 @@
+from bisect import bisect_left, bisect_right
+from day_ordinals import weekday
+
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+# ~~ LICENSE (EN) ~~
+
+# Copyrighted, Roger Meier 2021
+
+# Licensed under the EUPL-1.2 only, with the specific provisions (EUPL-1.2 articles 14 and 15)
+# that the applicable law is the Swiss law and the Jurisdiction Zürich, Switzerland.
+# Any redistribution must include the specific provisions above.
+
+# You should have received a copy of the EUPL-1.2 along with this code.
+# If not, see <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+
+# ~~ LIZENZ (DE) ~~
+
+# Urheberrechtlich geschützt, Roger Meier 2021
+
+# Lizenziert unter der EUPL, nur Version 1.2, mit der vorrangigen Bestimmung (Art. 14 und 15 EUPL-1.2),
+# dass diese Lizenz dem schweizerischen Recht untersteht und der Gerichtsstand Zürich, Schweiz, ist.
+# Jegliche Weiterverbreitung muss die vorgenannten Bestimmungen beinhalten.
+
+# Zusammen mit diesem Code sollten Sie eine Kopie der EUPL-1.2 erhalten haben.
+# Andernfalls siehe <https://joinup.ec.europa.eu/collection/eupl/eupl-text-eupl-12>.
+
+#§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§#
+
+
+# Workday arithmetic on day ordinals (see day_ordinals.py)
+# Workdays are described by a weekday mask (index 0 = Monday), holidays by a sorted sequence of day ordinals
+# Counting works in whole weeks and only visits the holidays, not every single day (cf. numpy.busday_count / numpy.busday_offset)
+
+
+# --- FUNCTIONS --- #
+
+# Function to create a weekday mask from a list of weekday numbers (0 = Monday)
+def weekday_mask(workdays):
+    return tuple(day in workdays for day in range(7))
+
+# Function to list the holidays falling on a workday between two day ordinals, both included
+def workday_holidays(mask, holidays, start, end):
+    return [day for day in holidays[bisect_left(holidays, start):bisect_right(holidays, end)] if mask[weekday(day)]]
+
+# Function to count the workdays between two day ordinals, both included
+def count_workdays(start, end, mask, holidays=()):
+    if end < start:
+        return 0
+    weeks, rest = divmod(end - start + 1, 7)
+    first = weekday(start)
+    count = weeks * sum(mask) + sum(mask[(first + i) % 7] for i in range(rest))
+    return count - len(workday_holidays(mask, holidays, start, end))
+
+# Function to find the nth workday on or after a day ordinal (n = 1: first workday)
+# Returns None if there are no workdays
+def nth_workday(start, n, mask, holidays=()):
+    per_week = sum(mask)
+    if (per_week == 0) or (n < 1):
+        return None
+    # Skip whole weeks, then walk the remaining week
+    weeks, rest = divmod(n - 1, per_week)
+    day = start + weeks * 7
+    while (mask[weekday(day)] == False) or (rest > 0):
+        if mask[weekday(day)] == True:
+            rest -= 1
+        day += 1
+    # Every holiday on a workday up to the found day postpones it by one workday
+    index = bisect_left(holidays, start)
+    while (index < len(holidays)) and (holidays[index] <= day):
+        if mask[weekday(holidays[index])] == True:
+            day = nth_workday(day + 1, 1, mask)
+        index += 1
+    return day